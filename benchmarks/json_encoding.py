@@ -0,0 +1,121 @@
+"""
+Benchmark of the JSON encoders of the payloads.
+
+Compares the previous ``json.dumps(data, default=str)`` with the registered encoders on payloads similar to the
+contexts sent by the DashboardRenderStarted and CertificateRenderStarted filters, and checks that they all produce
+the same data. The previous encoder sent datetimes as ``str(datetime)``, so they are compared once parsed.
+
+Usage::
+
+    python benchmarks/json_encoding.py [--number 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+
+import django  # pylint: disable=wrong-import-position
+
+django.setup()
+
+from opaque_keys.edx.keys import CourseKey  # pylint: disable=wrong-import-position
+
+from openedx_webhooks import encoders  # pylint: disable=wrong-import-position
+
+
+def build_payloads():
+    """
+    Build payloads similar to the render contexts of the dashboard and certificate filters.
+    """
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    user = {
+        "id": 4, "username": "andres", "email": "andres@example.com", "first_name": "Andrés", "last_name": "",
+        "is_staff": False, "is_active": True, "date_joined": now, "last_login": now + timedelta(days=30),
+    }
+
+    enrollments = []
+    for i in range(60):
+        course_key = CourseKey.from_string(f"course-v1:edX+Course{i}+2024")
+        enrollments.append({
+            "course_id": course_key,
+            "display_name": f"Course number {i} with a long display name",
+            "start": now + timedelta(days=i), "end": now + timedelta(days=i + 90),
+            "mode": "verified" if i % 3 else "audit", "is_active": True, "created": now,
+            "course_image_url": f"/asset-v1:edX+Course{i}+2024+type@asset+block@images_course_image.jpg",
+            "progress": {"complete": i, "incomplete": 60 - i, "percent": i / 60},
+            "certificate": {"status": "downloadable", "uuid": uuid4(), "grade": "0.87"} if i % 4 == 0 else None,
+        })
+    dashboard = {
+        "context": {"user": user, "course_enrollments": enrollments, "show_courseware_links_for": {}},
+        "template_name": "dashboard.html",
+        "event_metadata": {"event_type": "DashboardRenderStarted", "time": str(now)},
+    }
+
+    certificate = {
+        "context": {
+            "user": user,
+            "course_id": CourseKey.from_string("course-v1:edX+DemoX+Demo_Course"),
+            "certificate_data": {"uuid": uuid4(), "created_date": now, "grade": "0.9", "mode": "verified"},
+            "document_title": "Demo Course certificate", "platform_name": "Open edX",
+            "accomplishment_copy_description_full": "A long sentence about the accomplishment. " * 10,
+            "organization_logo": "https://example.com/logo.png",
+            "badges": [{"name": f"Badge {i}", "issued": now} for i in range(20)],
+        },
+        "custom_template": None,
+        "event_metadata": {"event_type": "CertificateRenderStarted", "time": str(now)},
+    }
+    return {"dashboard": dashboard, "certificate": certificate}
+
+
+def _parse_datetimes(value):
+    """
+    Parse the datetimes of decoded JSON, whatever their format.
+    """
+    if isinstance(value, dict):
+        return {key: _parse_datetimes(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_parse_datetimes(item) for item in value]
+    if isinstance(value, str) and value[:4].isdigit():
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+
+def previous_encoder(data):
+    """
+    Encoding used by `Payload.json` before the encoders registry.
+    """
+    return json.dumps(data, default=str).encode('utf-8')
+
+
+def main():
+    """
+    Run the benchmark and print the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200, help="Number of encodings per measure.")
+    args = parser.parse_args()
+
+    for name, payload in build_payloads().items():
+        expected = _parse_datetimes(json.loads(previous_encoder(payload)))
+        previous = min(timeit.repeat(lambda p=payload: previous_encoder(p), number=args.number, repeat=5))
+        print(f"{name:12} {'previous':8} {previous / args.number * 1e6:9.1f} us")
+
+        for encoder_name in sorted(encoders._encoders):  # pylint: disable=protected-access
+            encode = encoders.get_encoder(encoder_name)
+            assert _parse_datetimes(json.loads(encode(payload))) == expected, (name, encoder_name)
+            elapsed = min(timeit.repeat(lambda p=payload, e=encode: e(p), number=args.number, repeat=5))
+            print(f"{name:12} {encoder_name:8} {elapsed / args.number * 1e6:9.1f} us   "
+                  f"speedup: {previous / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
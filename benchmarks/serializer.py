@@ -0,0 +1,154 @@
+"""
+Benchmark of the serialization of event and filter data.
+
+Compares `serializers.serialize`, which caches a serialization plan per class and serializes shared objects once,
+with the previous implementation of `utils.object_serializer`, which went through all the type checks for every
+object, on payloads similar to the ones sent by the render and certificate filters. The cyclic payload, where blocks
+point back to their parent, was only stopped by the depth limit before.
+
+Usage::
+
+    python benchmarks/serializer.py [--number 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+import attr
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from xblock.fields import ScopeIds
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openedx_webhooks.serializers import scope_ids_serializer, serialize  # pylint: disable=wrong-import-position
+
+
+def legacy_object_serializer(o, depth=0):
+    """
+    Previous implementation of `utils.object_serializer`.
+    """
+    if depth > 15:
+        return "! Depth limit reached !"
+    if isinstance(o, (int, float, str)) or o is None:
+        return o
+    elif isinstance(o, ScopeIds):  # pylint: disable=no-else-return
+        return scope_ids_serializer(o)
+    elif isinstance(o, CourseKey.__mro__[-2]):
+        return str(o)
+    if isinstance(o, (list, tuple, set)):
+        return [legacy_object_serializer(item, depth + 1) for item in o]
+    return_value = {}
+    if isinstance(o, dict):
+        dict_values = o.copy()
+    elif hasattr(o, "__dict__"):
+        dict_values = o.__dict__.copy()
+    elif hasattr(o, "__str__"):
+        return str(o)
+    else:
+        return f"Unserializable {type(o)}"
+    for key, value in dict_values.items():
+        if isinstance(key, str):
+            if not key.startswith("_"):
+                return_value[key] = legacy_object_serializer(value, depth + 1)
+    return return_value
+
+
+@attr.s(frozen=True)
+class UserData:
+    """Similar to openedx_events UserData."""
+
+    id = attr.ib(type=int)
+    is_active = attr.ib(type=bool)
+    pii = attr.ib(type=dict)
+
+
+@attr.s(frozen=True)
+class CertificateData:
+    """Similar to openedx_events CertificateData."""
+
+    user = attr.ib(type=UserData)
+    course_key = attr.ib(type=CourseKey)
+    mode = attr.ib(type=str)
+    grade = attr.ib(type=str)
+    current_status = attr.ib(type=str)
+    download_url = attr.ib(type=str)
+    name = attr.ib(type=str)
+
+
+class Runtime:
+    """Object with many plain attributes, like an XBlock runtime."""
+
+    def __init__(self, course_key):
+        self.course_id = course_key
+        self.user_id = 4
+        self.anonymous_student_id = "abcdef0123456789"
+        self.static_url = "/static/"
+        self.settings = {f"setting_{i}": i for i in range(30)}
+        self._services = {"i18n": object()}
+
+
+class Block:
+    """Object similar to an XBlock."""
+
+    def __init__(self, course_key, index, runtime):
+        usage_key = UsageKey.from_string(f"block-v1:{course_key.org}+{course_key.course}+{course_key.run}"
+                                         f"+type@problem+block@p{index}")
+        self.scope_ids = ScopeIds(4, "problem", usage_key, usage_key)
+        self.location = usage_key
+        self.display_name = f"Problem {index}"
+        self.weight = 1.0
+        self.graded = True
+        self.start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.fields = {f"field_{i}": f"value {i}" for i in range(20)}
+        self.runtime = runtime
+        self.children = []
+
+
+def build_payloads():
+    """
+    Build payloads similar to the ones of VerticalBlockChildRenderStarted and CertificateCreationRequested.
+    """
+    course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+    runtime = Runtime(course_key)
+    vertical = Block(course_key, 0, runtime)
+    vertical.children = [Block(course_key, i, runtime) for i in range(1, 31)]
+    render = {"block": vertical, "context": {"view": "student_view", "username": "andres", "child_of_vertical": True}}
+
+    user = UserData(id=4, is_active=True, pii={"username": "andres", "email": "andres@example.com", "name": "A"})
+    certificate = {
+        "certificate": CertificateData(user, course_key, "verified", "0.9", "downloadable", "", "Andrés"),
+        "completion_summary": {"complete_count": 40, "incomplete_count": 2, "locked_count": 0},
+    }
+
+    parent = Block(course_key, 0, runtime)
+    parent.children = [Block(course_key, i, runtime) for i in range(1, 4)]
+    for child in parent.children:
+        child.parent = parent
+    cyclic = {"block": parent}
+
+    return {"render": render, "certificate": certificate, "cyclic": cyclic}
+
+
+def main():
+    """
+    Run the benchmark and print the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200, help="Number of serializations per measure.")
+    args = parser.parse_args()
+
+    for name, payload in build_payloads().items():
+        if name != "cyclic":
+            assert serialize(payload) == legacy_object_serializer(payload), name
+
+        legacy = min(timeit.repeat(lambda p=payload: legacy_object_serializer(p), number=args.number, repeat=5))
+        planned = min(timeit.repeat(lambda p=payload: serialize(p), number=args.number, repeat=5))
+
+        print(f"{name:12} previous: {legacy / args.number * 1e6:9.1f} us   "
+              f"plans: {planned / args.number * 1e6:9.1f} us   speedup: {legacy / planned:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of the overhead added by the plugin to each Open edX signal.
+
+Most signals have no webhooks configured. This measures how long a signal takes to be sent with and without the
+plugin receiver connected, and compares the receiver with the per-event database query it used to run.
+
+Usage::
+
+    python benchmarks/signal_overhead.py [--number 100000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_settings")
+
+import django  # pylint: disable=wrong-import-position
+
+django.setup()
+
+from django.db import connection  # pylint: disable=wrong-import-position
+from django.dispatch import Signal  # pylint: disable=wrong-import-position
+
+from openedx_webhooks import receivers  # pylint: disable=wrong-import-position
+from openedx_webhooks.models import Webhook  # pylint: disable=wrong-import-position
+
+
+def _per_call(statement, number):
+    """
+    Get the best time per call of a statement, in microseconds.
+    """
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def _query_per_event():
+    """
+    Run the lookup every receiver did before the configuration cache.
+    """
+    webhooks = Webhook.objects.filter(enabled=True, event="SESSION_LOGIN_COMPLETED")
+    if webhooks:
+        pass
+
+
+def main():
+    """
+    Run the benchmark and print the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=100000, help="Number of signals sent per measure.")
+    args = parser.parse_args()
+
+    # Use an in-memory database, with a webhook configured for another event
+    connection.creation.create_test_db(verbosity=0)
+    Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/hook")
+
+    signal = Signal()
+    without_receiver = _per_call(lambda: signal.send(sender=None, user=None), args.number)
+
+    signal.connect(receivers.session_login_completed_receiver)
+    with_receiver = _per_call(lambda: signal.send(sender=None, user=None), args.number)
+
+    query = _per_call(_query_per_event, max(args.number // 100, 1))
+
+    print(f"Signal without receiver:              {without_receiver:8.3f} us")
+    print(f"Signal with receiver, no webhooks:    {with_receiver:8.3f} us")
+    print(f"Overhead per signal:                  {with_receiver - without_receiver:8.3f} us")
+    print(f"Database lookup per event (previous): {query:8.3f} us")
+
+
+if __name__ == "__main__":
+    main()
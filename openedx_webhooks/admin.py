@@ -13,13 +13,13 @@ import logging
 
 from django.contrib import admin
 
-from .models import Webfilter, Webhook
+from .models import Webfilter, Webhook, WebhookDelivery
 
 logger = logging.getLogger(__name__)
 
 
 class WebhooksAdmin(admin.ModelAdmin):
-    list_display = [f.name for f in Webhook._meta.get_fields()]
+    list_display = [f.name for f in Webhook._meta.fields]
 
 
 class WebfilterAdmin(admin.ModelAdmin):
@@ -35,6 +35,26 @@ class WebfilterAdmin(admin.ModelAdmin):
     ]
 
 
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = [
+        'event',
+        'webhook',
+        'entity_key',
+        'status',
+        'attempts',
+        'coalesced_events',
+        'status_code',
+        'created',
+        'next_attempt_at',
+        'delivered_at',
+    ]
+    list_filter = ['status', 'event']
+    list_select_related = ['webhook']
+    raw_id_fields = ['webhook']
+    search_fields = ['entity_key']
+
+
 logger.debug("Registering Webhook")
 admin.site.register(Webhook, WebhooksAdmin)
 admin.site.register(Webfilter, WebfilterAdmin)
+admin.site.register(WebhookDelivery, WebhookDeliveryAdmin)
@@ -122,3 +122,9 @@ class WebhooksConfig(AppConfig):
     }
 
     logger.info("Open edx Webhooks: signals registerd")
+
+    def ready(self):
+        """
+        Connect the handlers that keep the configuration cache up to date.
+        """
+        from . import config  # pylint: disable=import-outside-toplevel,unused-import
@@ -0,0 +1,84 @@
+"""
+Batched calls of the webfilters that run once for each child of a vertical.
+
+`VerticalBlockChildRenderStarted` runs for each child block while a vertical renders, so a unit with 30 components
+makes 30 calls one after the other. When a webfilter batches children, the first child calls its URL once with a
+JSON array of the payloads of all the children of the vertical. The response must be a JSON array with the usual
+response of each child (with its ``data`` and ``exception`` keys), in the same order. The response of each child
+is kept in the request scope, and the next children of the vertical use theirs without calling the URL again.
+
+Errors of the batched call (a request exception, an error status code or an invalid response) are the result of
+every child, and are handled for each of them with the settings of the webfilter.
+"""
+import json
+import logging
+
+import requests
+
+from .response_cache import CachedResponse
+from .utils import Payload, send
+
+logger = logging.getLogger(__name__)
+
+
+def split_response(url, response, count):
+    """
+    Get the response of each of the `count` items of a batched call to url.
+    """
+    if not 200 <= response.status_code <= 299:
+        return [response] * count
+
+    try:
+        items = json.loads(response.text)
+    except json.decoder.JSONDecodeError as e:
+        logger.warning(f"Non JSON response received from batched call to {url}: '{response.text}' ({e})")
+        items = None
+
+    if not isinstance(items, list) or len(items) != count:
+        logger.error(f"Batched call to {url} didn't return a JSON array with the response of each of "
+                     f"its {count} items.")
+        items = [{}] * count
+
+    return [CachedResponse(response.status_code, response.reason, json.dumps(item)) for item in items]
+
+
+def send_batch(webfilter, payloads, timeout):
+    """
+    Call the webfilter URL once with a JSON array of the payloads, and return the response of each payload.
+    """
+    logger.info(f"{webfilter.event} webhook filter triggered to {webfilter.webhook_url} for {len(payloads)} items")
+    body = b"[" + b",".join(payload.json for payload in payloads) + b"]"
+    response = send(
+        webfilter.webhook_url,
+        Payload(encoded_json=body),
+        timeout=timeout,
+        compression=webfilter.request_compression,
+    )
+    return split_response(webfilter.webhook_url, response, len(payloads))
+
+
+def get_response(scope, webfilter, batch, build_payload, timeout):
+    """
+    Get the response of the webfilter for the current item of a batch.
+
+    The first time, the URL is called once for all the items. `batch` is a (batch id, item id, get_items) tuple,
+    where `get_items()` returns the [(item id, data), ...] of all the items of the batch, and is only called then.
+    `build_payload` builds the payload of the webfilter for the data of an item. Returns None when the current item is
+    not in the batch, and raises the request exception of the batched call.
+    """
+    batch_id, item_id, get_items = batch
+    key = (webfilter.pk, batch_id)
+    if key not in scope.batches:
+        items = get_items()
+        item_ids = [item[0] for item in items]
+        payloads = [build_payload(webfilter.payload_fields, data) for _, data in items]
+        try:
+            responses = send_batch(webfilter, payloads, timeout)
+        except requests.exceptions.RequestException as e:
+            responses = [e] * len(payloads)
+        scope.batches[key] = dict(zip(item_ids, responses))
+
+    response = scope.batches[key].get(item_id)
+    if isinstance(response, Exception):
+        raise response
+    return response
@@ -0,0 +1,103 @@
+"""
+Circuit breaker for webhook URLs.
+
+After WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD consecutive failures (connection errors, timeouts or 5xx responses) of a
+URL, the circuit opens and calls to that URL fail right away for WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT seconds,
+instead of waiting for the request timeout. Then the circuit is half-open: a single call is let through as a probe.
+If it succeeds the circuit closes, otherwise it opens again.
+
+The state is kept in the Django cache, so all the processes and servers stop calling an endpoint that is down.
+"""
+import hashlib
+import logging
+import time
+
+import requests
+from django.core.cache import cache
+
+from .settings.common import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    The request was not sent because the circuit of the URL is open.
+    """
+
+
+def _keys(url):
+    """
+    Get the cache keys of the circuit state of a URL.
+    """
+    prefix = f"openedx_webhooks.circuit.{hashlib.sha1(url.encode('utf-8')).hexdigest()}"
+    return f"{prefix}.failures", f"{prefix}.opened_until", f"{prefix}.probe"
+
+
+def _enabled():
+    return get_setting("WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD") > 0
+
+
+def allow_request(url):
+    """
+    Check if a request to the URL can be sent.
+
+    When the circuit is half-open, only the first caller gets to send the probe request.
+    """
+    if not _enabled():
+        return True
+
+    _, opened_key, probe_key = _keys(url)
+    opened_until = cache.get(opened_key)
+    if opened_until is None:
+        return True
+    if time.time() < opened_until:
+        return False
+    return cache.add(probe_key, True, timeout=get_setting("WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT"))
+
+
+def opened_until(url):
+    """
+    Get the time until which the circuit of the URL is open, or None if it is closed.
+    """
+    if not _enabled():
+        return None
+    return cache.get(_keys(url)[1])
+
+
+def record_success(url):
+    """
+    Close the circuit of the URL.
+    """
+    if not _enabled():
+        return
+
+    failures_key, opened_key, probe_key = _keys(url)
+    if cache.get_many([failures_key, opened_key]):
+        logger.info(f"Closing the circuit of {url}")
+        cache.delete_many([failures_key, opened_key, probe_key])
+
+
+def record_failure(url):
+    """
+    Count a failed request to the URL, opening its circuit when the threshold is reached.
+    """
+    if not _enabled():
+        return
+
+    failures_key, opened_key, probe_key = _keys(url)
+    reset_timeout = get_setting("WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT")
+
+    cache.add(failures_key, 0, timeout=None)
+    try:
+        failures = cache.incr(failures_key)
+    except ValueError:
+        # The key was evicted in between
+        failures = 1
+        cache.set(failures_key, failures, timeout=None)
+
+    # A failed probe opens the circuit again, as does reaching the threshold
+    if failures >= get_setting("WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD") or cache.get(opened_key) is not None:
+        logger.warning(f"Opening the circuit of {url} for {reset_timeout}s after {failures} consecutive failures")
+        cache.set(opened_key, time.time() + reset_timeout, timeout=None)
+        cache.delete(probe_key)
@@ -0,0 +1,55 @@
+"""
+Cache of the course completion summaries sent to the certificate webfilters.
+
+`CertificateRenderStarted` and `CertificateCreationRequested` add the completion summary of the user in the course
+to their data. Computing it traverses the block structure of the course, and it is needed on every view of a
+certificate that rarely changes. Summaries are kept in the Django cache by course and user for
+WEBHOOKS_COMPLETION_SUMMARY_TTL seconds, and discarded when a grade or passing status event of the user in the
+course is received. Completion of content that isn't graded doesn't send any of these events, so the TTL bounds
+how long a summary can be out of date.
+"""
+import logging
+
+from django.core.cache import cache
+
+from .utils import get_setting
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "openedx_webhooks.completion_summary"
+
+
+def _get_key(course_key, user_id):
+    return f"{CACHE_KEY_PREFIX}.{course_key}.{user_id}"
+
+
+def get_completion_summary(course_key, user, compute):
+    """
+    Get the completion summary of the user in the course.
+
+    It is computed with `compute(course_key, user)` when it is not cached.
+    """
+    ttl = get_setting("WEBHOOKS_COMPLETION_SUMMARY_TTL")
+    if not ttl:
+        return compute(course_key, user)
+
+    key = _get_key(course_key, user.id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute(course_key, user)
+        cache.set(key, summary, timeout=ttl)
+    return summary
+
+
+def invalidate(course_key, user_id):
+    """
+    Discard the cached completion summary of the user in the course.
+
+    Does nothing when the summaries are not cached. Summaries cached while a webfilter included them are discarded
+    even if no webfilter includes them anymore, as they would be reused if one includes them again.
+    """
+    if not get_setting("WEBHOOKS_COMPLETION_SUMMARY_TTL"):
+        return
+
+    logger.debug(f"Discarding the completion summary of user {user_id} in {course_key}")
+    cache.delete(_get_key(course_key, user_id))
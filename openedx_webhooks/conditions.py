@@ -0,0 +1,176 @@
+"""
+Conditions to route events to the webhooks and webfilters that need them.
+
+A condition is a Python-like boolean expression over the fields of the raw event or filter data, e.g.::
+
+    course.course_key.org in {"edX", "OpenCraft"} and mode == "verified"
+
+Only comparisons (``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in``, ``not in``, ``is``, ``is not``), ``and``,
+``or``, ``not``, constants, sets, lists and tuples of constants, and dotted field paths are allowed. The expression
+is never passed to `eval`: it is parsed and compiled once into a predicate function, which is checked before the data
+is serialized, so events that don't match skip the serialization and the HTTP call.
+
+Fields that don't exist are None, and opaque keys are compared as strings.
+"""
+import ast
+import logging
+import operator
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+from opaque_keys import OpaqueKey
+
+from .projection import get_field
+
+logger = logging.getLogger(__name__)
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+
+class ConditionError(ValueError):
+    """
+    The condition is not a valid expression.
+    """
+
+
+def _resolve(data, path):
+    """
+    Get the value of a dotted field path in the data.
+    """
+    value = data
+    for name in path:
+        try:
+            value = get_field(value, name)
+        except (KeyError, AttributeError):
+            return None
+    if isinstance(value, OpaqueKey):
+        return str(value)
+    return value
+
+
+def _path(node):
+    """
+    Get the names of a dotted field path.
+    """
+    if isinstance(node, ast.Name):
+        path = [node.id]
+    elif isinstance(node, ast.Attribute):
+        path = _path(node.value) + [node.attr]
+    else:
+        raise ConditionError(f"Unsupported expression in field path: {type(node).__name__}")
+    if path[-1].startswith("_"):
+        raise ConditionError(f"Private field not allowed: {path[-1]}")
+    return path
+
+
+def _constant(node):
+    """
+    Get the value of a constant, or of a set, list or tuple of constants.
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Set):
+        return frozenset(_constant(element) for element in node.elts)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return tuple(_constant(element) for element in node.elts)
+    raise ConditionError(f"Only constants are allowed in collections, not {type(node).__name__}")
+
+
+def _compile_node(node):  # pylint: disable=too-many-return-statements
+    """
+    Compile an expression node into a function of the data.
+    """
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile_node(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda data: all(operand(data) for operand in operands)
+        return lambda data: any(operand(data) for operand in operands)
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile_node(node.operand)
+        return lambda data: not operand(data)
+
+    if isinstance(node, ast.Compare):
+        try:
+            operators = [_COMPARISONS[type(op)] for op in node.ops]
+        except KeyError as e:
+            raise ConditionError(f"Unsupported comparison: {e.args[0].__name__}") from e
+        left = _compile_node(node.left)
+        comparators = [_compile_node(comparator) for comparator in node.comparators]
+
+        def _compare(data):
+            a = left(data)
+            for op, comparator in zip(operators, comparators):
+                b = comparator(data)
+                if not op(a, b):
+                    return False
+                a = b
+            return True
+
+        return _compare
+
+    if isinstance(node, (ast.Constant, ast.Set, ast.List, ast.Tuple)):
+        value = _constant(node)
+        return lambda data: value
+
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        path = _path(node)
+        return lambda data: _resolve(data, path)
+
+    raise ConditionError(f"Unsupported expression: {type(node).__name__}")
+
+
+@lru_cache(maxsize=256)
+def compile_condition(condition):
+    """
+    Compile a condition into a predicate function of the data.
+
+    Raises `ConditionError` if the condition is not valid.
+    """
+    try:
+        tree = ast.parse(condition.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ConditionError(f"Invalid syntax: {e.msg}") from e
+    return _compile_node(tree.body)
+
+
+def validate_condition(condition):
+    """
+    Check that the condition can be compiled.
+    """
+    if not condition.strip():
+        return
+    try:
+        compile_condition(condition)
+    except ConditionError as e:
+        raise ValidationError(_("Invalid condition: %(error)s"), params={"error": e}) from e
+
+
+def matches(condition, data):
+    """
+    Check if the data matches the condition. An empty condition matches all the data.
+
+    Invalid conditions, and conditions that can't be evaluated on the data (e.g. comparing a number with None),
+    don't match.
+    """
+    if not condition or not condition.strip():
+        return True
+    try:
+        return bool(compile_condition(condition)(data))
+    except ConditionError as e:
+        logger.error(f"Invalid condition '{condition}': {e}")
+    except TypeError as e:
+        logger.warning(f"Condition '{condition}' could not be evaluated: {e}")
+    return False
@@ -0,0 +1,125 @@
+"""
+In-process cache of the enabled webhooks and webfilters.
+
+Each process keeps a snapshot of the enabled `Webhook` and `Webfilter` rows indexed by event, so processing an event
+doesn't need to query the database. Saving or deleting any of them changes a generation token shared through the
+Django cache. Every process compares its snapshot against that token at most every
+WEBHOOKS_CONFIG_REFRESH_INTERVAL seconds and reloads it when it changed.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Webfilter, Webhook
+from .utils import get_setting
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_KEY = "openedx_webhooks.config.generation"
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class ConfigSnapshot:
+    """
+    Enabled webhooks and webfilters indexed by event name.
+    """
+
+    def __init__(self, generation):
+        """
+        Load the enabled webhooks and webfilters from the database.
+        """
+        self.generation = generation
+        self.checked_at = time.monotonic()
+        self.refresh_interval = get_setting("WEBHOOKS_CONFIG_REFRESH_INTERVAL")
+
+        self.webhooks = defaultdict(list)
+        for webhook in Webhook.objects.filter(enabled=True).order_by('id'):
+            self.webhooks[webhook.event].append(webhook)
+
+        self.webfilters = defaultdict(list)
+        for webfilter in Webfilter.objects.filter(enabled=True).order_by('id'):
+            self.webfilters[webfilter.event].append(webfilter)
+
+        # Events with at least one enabled webhook. Receivers of any other event return right away.
+        self.active_events = frozenset(self.webhooks)
+
+
+def _get_generation():
+    """
+    Get the shared configuration generation, creating it if it is not in the cache.
+    """
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def get_snapshot():
+    """
+    Get the configuration snapshot of this process, reloading it if the configuration changed.
+    """
+    global _snapshot  # pylint: disable=global-statement
+
+    snapshot = _snapshot
+    if snapshot and time.monotonic() - snapshot.checked_at < snapshot.refresh_interval:
+        return snapshot
+
+    with _lock:
+        # Another thread may have refreshed the snapshot while we were waiting for the lock
+        if _snapshot is not None and _snapshot is not snapshot:
+            return _snapshot
+
+        generation = _get_generation()
+        if snapshot and snapshot.generation == generation:
+            snapshot.checked_at = time.monotonic()
+        else:
+            logger.debug(f"Loading webhooks configuration (generation {generation})")
+            snapshot = ConfigSnapshot(generation)
+            _snapshot = snapshot
+
+    return snapshot
+
+
+def get_webhooks(event_name):
+    """
+    Get the enabled webhooks for an event.
+    """
+    return get_snapshot().webhooks.get(event_name, [])
+
+
+def get_webfilters(event_name):
+    """
+    Get the enabled webfilters for an event.
+    """
+    return get_snapshot().webfilters.get(event_name, [])
+
+
+def invalidate():
+    """
+    Discard the configuration snapshots of all the processes.
+    """
+    global _snapshot  # pylint: disable=global-statement
+
+    cache.set(GENERATION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+    _snapshot = None
+
+
+@receiver(post_save, sender=Webhook)
+@receiver(post_delete, sender=Webhook)
+@receiver(post_save, sender=Webfilter)
+@receiver(post_delete, sender=Webfilter)
+def configuration_changed(**kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the configuration snapshots once the change is committed.
+    """
+    transaction.on_commit(invalidate)
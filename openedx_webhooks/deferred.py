@@ -0,0 +1,111 @@
+"""
+Webhook calls deferred until the database transaction that triggered the event commits.
+
+Events are often sent inside the transaction of the request (e.g. with ATOMIC_REQUESTS). Calling the webhook URLs
+right away would keep the transaction, its locks and its connection open during the HTTP calls, and would send events
+of work that may still be rolled back.
+
+Instead, the calls of all the events of a transaction are collected in a batch, which is sent in a single flush when
+the transaction commits, and dropped if it rolls back. Events sent inside a savepoint get their own batch, dropped
+with the savepoint if it is rolled back. Outside of a transaction, the webhooks are called right away.
+"""
+import logging
+import threading
+
+import requests
+from django.db import transaction
+
+from .circuit_breaker import CircuitOpenError
+from .deliveries import record_failed_attempt, record_postponed
+from .fanout import fan_out
+from .utils import get_setting, send
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def _send(call):
+    event_name, webhook, payload = call
+    logger.info(f"{event_name} webhook triggered to {webhook.webhook_url}")
+    return send(
+        webhook.webhook_url,
+        payload,
+        www_form_urlencoded=webhook.use_www_form_encoding,
+        timeout=(webhook.connect_timeout, webhook.read_timeout),
+        compression=webhook.request_compression,
+    )
+
+
+def send_now(calls):
+    """
+    Call the webhook URLs concurrently, and store the failed calls in the outbox to be retried.
+
+    Each call is an (event name, webhook, payload) tuple.
+    """
+    futures = fan_out(_send, calls, url=lambda call: call[1].webhook_url)
+    for (event_name, webhook, payload), future in zip(calls, futures):
+        # Failed deliveries are retried later by the dispatcher, never in the request that triggered the event
+        try:
+            response = future.result()
+        except CircuitOpenError as e:
+            # The URL was not called, so the delivery waits for the circuit to close without using up an attempt
+            record_postponed(webhook, event_name, payload, str(e))
+            continue
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"{event_name} webhook to {webhook.webhook_url} failed: {e}")
+            record_failed_attempt(webhook, event_name, payload, str(e))
+            continue
+
+        if not response.ok:
+            logger.warning(f"{event_name} webhook to {webhook.webhook_url} returned status code "
+                           f"{response.status_code} ({response.reason}).")
+            record_failed_attempt(webhook, event_name, payload, f"{response.status_code} {response.reason}",
+                                  response.status_code)
+
+
+class _Batch:
+    """
+    Webhook calls waiting for the commit of a transaction or savepoint.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.flushed = False
+        # The same bound method object is registered and looked for in the commit hooks
+        self.callback = self.flush
+
+    def flush(self):
+        self.flushed = True
+        logger.debug(f"Sending {len(self.calls)} webhook calls after commit")
+        send_now(self.calls)
+
+    def is_pending(self, connection):
+        """
+        Check if the batch will still be sent on commit, i.e. it wasn't sent nor dropped by a rollback.
+        """
+        return not self.flushed and any(func is self.callback for _, func, _ in connection.run_on_commit)
+
+
+def send_on_commit(calls):
+    """
+    Call the webhook URLs when the current transaction commits, or right away if there is no transaction.
+
+    Each call is an (event name, webhook, payload) tuple.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block or not get_setting("WEBHOOKS_SEND_ON_COMMIT"):
+        send_now(calls)
+        return
+
+    # One batch per savepoint, so the calls are dropped together with the savepoint if it is rolled back
+    batches = _local.__dict__.setdefault("batches", {})
+    level = tuple(connection.savepoint_ids)
+    batch = batches.get(level)
+    if batch is None or not batch.is_pending(connection):
+        # Forget the batches already sent or rolled back
+        for key in [key for key, other in batches.items() if not other.is_pending(connection)]:
+            del batches[key]
+        batch = batches[level] = _Batch()
+        transaction.on_commit(batch.callback)
+    batch.calls.extend(calls)
@@ -0,0 +1,406 @@
+"""
+Outbox of webhook deliveries.
+
+When the outbox is enabled, the event receivers only store the payload to send in a `WebhookDelivery` record.
+The dispatcher (see the `dispatch_webhooks` management command) claims the pending deliveries and calls the
+webhook URLs out of the request that triggered the event.
+
+Failed deliveries are stored in the outbox too, and retried by the dispatcher with a capped exponential backoff.
+
+The deliveries of batched webhooks always go through the outbox. The dispatcher sends them grouped in a single
+request per webhook when enough of them are pending or the oldest one has waited long enough, and records the
+result of the request in each delivery.
+
+Webhooks with a coalesce window also go through the outbox. The events of the same entity (block, library or course)
+received during the window are merged into a single pending delivery, which carries the data of the latest event and
+the number of events merged, and is sent when the window ends.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+import requests
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from . import circuit_breaker
+from .fanout import fan_out
+from .models import Webhook, WebhookDelivery
+from .utils import Payload, get_setting, send
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(webhook, event_name, payload):
+    """
+    Store a delivery of the payload to the webhook in the outbox.
+    """
+    if not isinstance(payload, Payload):
+        payload = Payload(payload)
+
+    delivery = WebhookDelivery.objects.create(
+        webhook=webhook,
+        event=event_name,
+        payload=payload.json.decode('utf-8'),
+    )
+    logger.debug(f"{event_name} delivery to {webhook.webhook_url} stored in the outbox")
+    return delivery
+
+
+def enqueue_coalesced(webhook, event_name, payload, entity_key):
+    """
+    Store a delivery in the outbox, merging it with the pending delivery of the same event and entity if there is one.
+
+    The delivery is sent when the coalesce window of the webhook ends. Its payload is the one of the latest event,
+    with the number of events merged in the `coalesced_events` key.
+    """
+    if not isinstance(payload, Payload):
+        payload = Payload(payload)
+
+    with transaction.atomic():
+        # Deliveries already attempted are left alone, their retries keep the data that was sent
+        delivery = (
+            WebhookDelivery.objects
+            .select_for_update()
+            .filter(
+                webhook=webhook,
+                event=event_name,
+                entity_key=entity_key,
+                status=WebhookDelivery.STATUS_PENDING,
+                attempts=0,
+            )
+            .order_by('-created')
+            .first()
+        )
+        if delivery is None:
+            delivery = WebhookDelivery(
+                webhook=webhook,
+                event=event_name,
+                entity_key=entity_key,
+                next_attempt_at=timezone.now() + timedelta(seconds=webhook.coalesce_window),
+                coalesced_events=0,
+            )
+
+        delivery.coalesced_events += 1
+        # The payload may be shared with other webhooks, so it is copied instead of modified
+        delivery.payload = Payload(
+            {**payload.data, 'coalesced_events': delivery.coalesced_events}
+        ).json.decode('utf-8')
+        delivery.save()
+
+    logger.debug(f"{event_name} delivery to {webhook.webhook_url} for {entity_key} coalesced "
+                 f"({delivery.coalesced_events} events)")
+    return delivery
+
+
+def retry_delay(attempts):
+    """
+    Get the seconds to wait before retrying a delivery that failed `attempts` times.
+
+    The delay is a random value between 0 and a cap that doubles after each attempt (full jitter), so the
+    deliveries that failed during an endpoint outage don't all retry at the same time when it recovers.
+    """
+    cap = min(
+        get_setting("WEBHOOKS_RETRY_MAX_DELAY"),
+        get_setting("WEBHOOKS_RETRY_BASE_DELAY") * 2 ** (attempts - 1),
+    )
+    return random.uniform(0, cap)
+
+
+def is_retryable(status_code=None):
+    """
+    Check if a failed delivery can succeed when retried.
+
+    Connection errors (no status code), server errors, timeouts and rate limits are retried. Other client errors
+    won't change by sending the same payload again.
+    """
+    return status_code is None or status_code >= 500 or status_code in (408, 425, 429)
+
+
+def _set_failed_attempt(delivery, error, status_code=None):
+    """
+    Update a delivery after a failed attempt, scheduling a retry if possible.
+    """
+    delivery.last_error = error
+    delivery.status_code = status_code
+
+    if is_retryable(status_code) and delivery.attempts < get_setting("WEBHOOKS_MAX_ATTEMPTS"):
+        delay = retry_delay(delivery.attempts)
+        logger.info(f"Retrying {delivery.event} delivery to {delivery.webhook.webhook_url} in {delay:.0f}s "
+                    f"(attempt {delivery.attempts}).")
+        delivery.status = WebhookDelivery.STATUS_PENDING
+        delivery.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    else:
+        delivery.status = WebhookDelivery.STATUS_FAILED
+        delivery.next_attempt_at = None
+
+
+def _postpone(delivery, error):
+    """
+    Reschedule a delivery that wasn't sent because the circuit of its URL is open, without counting an attempt.
+
+    It is due when the circuit lets requests through again, plus a random delay to spread the deliveries waiting.
+    """
+    reopens_in = max((circuit_breaker.opened_until(delivery.webhook.webhook_url) or 0) - time.time(), 0)
+    delay = reopens_in + random.uniform(0, get_setting("WEBHOOKS_RETRY_BASE_DELAY"))
+    logger.info(f"Postponing {delivery.event} delivery to {delivery.webhook.webhook_url} for {delay:.0f}s: {error}")
+    delivery.last_error = error
+    delivery.status = WebhookDelivery.STATUS_PENDING
+    delivery.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+
+def _new_delivery(webhook, event_name, payload, attempts):
+    if not isinstance(payload, Payload):
+        payload = Payload(payload)
+
+    return WebhookDelivery(
+        webhook=webhook,
+        event=event_name,
+        payload=payload.json.decode('utf-8'),
+        attempts=attempts,
+    )
+
+
+def record_failed_attempt(webhook, event_name, payload, error, status_code=None):
+    """
+    Store in the outbox a delivery that failed while processing the event, to be retried by the dispatcher.
+    """
+    delivery = _new_delivery(webhook, event_name, payload, attempts=1)
+    _set_failed_attempt(delivery, error, status_code)
+    delivery.save()
+    return delivery
+
+
+def record_postponed(webhook, event_name, payload, error):
+    """
+    Store in the outbox a delivery not sent while processing the event because the circuit of its URL is open.
+
+    No attempt is counted, and the dispatcher sends it once the circuit lets requests through again.
+    """
+    delivery = _new_delivery(webhook, event_name, payload, attempts=0)
+    _postpone(delivery, error)
+    delivery.save()
+    return delivery
+
+
+def _due(now):
+    """
+    Get the filter of the deliveries that can be claimed.
+    """
+    stale = now - timedelta(seconds=get_setting("WEBHOOKS_DISPATCH_CLAIM_TIMEOUT"))
+    return (
+        Q(status=WebhookDelivery.STATUS_PENDING, next_attempt_at__isnull=True) |
+        Q(status=WebhookDelivery.STATUS_PENDING, next_attempt_at__lte=now) |
+        Q(status=WebhookDelivery.STATUS_SENDING, modified__lt=stale)
+    )
+
+
+def _mark_sending(deliveries):
+    WebhookDelivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).update(
+        status=WebhookDelivery.STATUS_SENDING,
+        modified=timezone.now(),
+    )
+
+
+def claim_pending(limit=None):
+    """
+    Mark a batch of pending deliveries of webhooks without batching as being sent by this dispatcher and return them.
+
+    Rows locked by other dispatchers are skipped, so many dispatchers can drain the outbox at the same time.
+    Deliveries claimed by a dispatcher that didn't finish them are claimed again after the claim timeout.
+    """
+    limit = limit or get_setting("WEBHOOKS_DISPATCH_BATCH_SIZE")
+
+    with transaction.atomic():
+        deliveries = list(
+            WebhookDelivery.objects
+            # Only the deliveries are locked, not their webhooks, which other dispatchers and inserts need
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('webhook')
+            .filter(_due(timezone.now()), webhook__batch_format='')
+            .order_by('created')[:limit]
+        )
+        _mark_sending(deliveries)
+
+    return deliveries
+
+
+def _claim_batch(webhook, now):
+    """
+    Claim the next batch of deliveries of a batched webhook, if it is ready to be sent.
+
+    A batch is ready when it has `batch_max_items` deliveries or `batch_max_bytes` of payloads, or when its oldest
+    delivery has waited `batch_max_age` seconds. Payloads are only loaded for the batches that are sent.
+    """
+    deliveries = list(
+        WebhookDelivery.objects
+        .select_for_update(skip_locked=True)
+        .filter(_due(now), webhook=webhook)
+        .defer('payload')
+        .annotate(payload_size=Length('payload'))
+        .order_by('created')[:webhook.batch_max_items]
+    )
+    if not deliveries:
+        return []
+
+    size = 0
+    ready = len(deliveries) >= webhook.batch_max_items
+    for count, delivery in enumerate(deliveries):
+        size += delivery.payload_size
+        if size > webhook.batch_max_bytes:
+            # Leave the rest for the next batch, keeping at least one delivery even if it is bigger than the maximum
+            deliveries = deliveries[:count or 1]
+            ready = True
+            break
+
+    if not ready and deliveries[0].created > now - timedelta(seconds=webhook.batch_max_age):
+        return []
+
+    payloads = dict(
+        WebhookDelivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).values_list('pk', 'payload')
+    )
+    for delivery in deliveries:
+        delivery.payload = payloads[delivery.pk]
+        delivery.webhook = webhook
+    _mark_sending(deliveries)
+    return deliveries
+
+
+def claim_batches():
+    """
+    Claim the batches of deliveries of the batched webhooks that are ready to be sent.
+    """
+    now = timezone.now()
+    batches = []
+    with transaction.atomic():
+        for webhook in Webhook.objects.exclude(batch_format=''):
+            batch = _claim_batch(webhook, now)
+            if batch:
+                batches.append(batch)
+    return batches
+
+
+def _send(delivery):
+    """
+    Call the webhook URL of a delivery.
+    """
+    return send(
+        delivery.webhook.webhook_url,
+        Payload.from_json(delivery.payload),
+        www_form_urlencoded=delivery.webhook.use_www_form_encoding,
+        timeout=(delivery.webhook.connect_timeout, delivery.webhook.read_timeout),
+        compression=delivery.webhook.request_compression,
+    )
+
+
+def _send_batch(batch):
+    """
+    Call the webhook URL of a batch of deliveries with all their payloads.
+    """
+    webhook = batch[0].webhook
+    items = [delivery.payload.encode('utf-8') for delivery in batch]
+    if webhook.batch_format == Webhook.BATCH_NDJSON:
+        body = b"\n".join(items) + b"\n"
+        content_type = 'application/x-ndjson'
+    else:
+        body = b"[" + b",".join(items) + b"]"
+        content_type = 'application/json'
+
+    return send(
+        webhook.webhook_url,
+        Payload(encoded_json=body),
+        timeout=(webhook.connect_timeout, webhook.read_timeout),
+        compression=webhook.request_compression,
+        content_type=content_type,
+    )
+
+
+def _record_result(delivery, future):
+    """
+    Record the result of a delivery attempt.
+    """
+    webhook = delivery.webhook
+
+    try:
+        response = future.result()
+    except circuit_breaker.CircuitOpenError as e:
+        # The URL was not called, so the delivery doesn't use up its attempts while the endpoint is down
+        _postpone(delivery, str(e))
+    except requests.exceptions.RequestException as e:
+        delivery.attempts += 1
+        logger.warning(f"{delivery.event} delivery to {webhook.webhook_url} failed: {e}")
+        _set_failed_attempt(delivery, str(e))
+    else:
+        delivery.attempts += 1
+        logger.info(f"{delivery.event} delivery to {webhook.webhook_url} returned status code "
+                    f"{response.status_code} ({response.reason}).")
+        if response.ok:
+            delivery.status = WebhookDelivery.STATUS_DELIVERED
+            delivery.status_code = response.status_code
+            delivery.delivered_at = timezone.now()
+            delivery.next_attempt_at = None
+            delivery.last_error = ''
+        else:
+            _set_failed_attempt(delivery, f"{response.status_code} {response.reason}", response.status_code)
+
+    delivery.save()
+
+
+def deliver_many(deliveries):
+    """
+    Send the deliveries concurrently and record their results.
+
+    Only the HTTP calls run in parallel. The results are saved from the calling thread.
+    """
+    futures = fan_out(_send, deliveries, url=lambda delivery: delivery.webhook.webhook_url)
+    for delivery, future in zip(deliveries, futures):
+        _record_result(delivery, future)
+    return deliveries
+
+
+def deliver_batches(batches):
+    """
+    Send the batches concurrently and record the result of each request in all the deliveries of its batch.
+    """
+    futures = fan_out(_send_batch, batches, url=lambda batch: batch[0].webhook.webhook_url)
+    for batch, future in zip(batches, futures):
+        for delivery in batch:
+            _record_result(delivery, future)
+    return batches
+
+
+def deliver(delivery):
+    """
+    Send one delivery to its webhook URL and record the result.
+    """
+    return deliver_many([delivery])[0]
+
+
+def dispatch_pending(limit=None):
+    """
+    Claim a batch of pending deliveries and the batches of the batched webhooks that are ready, and send them.
+
+    Returns the number of deliveries processed.
+    """
+    deliveries = claim_pending(limit)
+    deliver_many(deliveries)
+    batches = claim_batches()
+    deliver_batches(batches)
+    return len(deliveries) + sum(len(batch) for batch in batches)
+
+
+def prune():
+    """
+    Delete the delivered and failed deliveries not modified in the last WEBHOOKS_DELIVERY_RETENTION seconds.
+
+    Returns the number of deliveries deleted.
+    """
+    limit = timezone.now() - timedelta(seconds=get_setting("WEBHOOKS_DELIVERY_RETENTION"))
+    deleted, _ = WebhookDelivery.objects.filter(
+        status__in=[WebhookDelivery.STATUS_DELIVERED, WebhookDelivery.STATUS_FAILED],
+        modified__lt=limit,
+    ).delete()
+    return deleted
@@ -0,0 +1,109 @@
+"""
+JSON encoders of the payloads sent to webhooks and webfilters.
+
+Encoders are functions that take the payload data and return it encoded as JSON bytes. They are registered by name,
+and WEBHOOKS_JSON_ENCODER chooses the one used:
+
+- ``"auto"`` (default): ``"orjson"`` when the orjson library is installed, ``"json"`` otherwise.
+- ``"orjson"``: the orjson library, much faster for large payloads like the render contexts.
+- ``"json"``: the Python standard library.
+- The dotted path of any other function, or the name of an encoder added with `register_encoder`.
+
+All the encoders produce the same data as ``json.dumps(data, default=str)``, used before the encoders could be
+chosen: attrs instances are sent as dicts, and datetimes, UUIDs, opaque keys and other objects JSON can't represent
+as their string, e.g. ``2024-01-01 12:30:00+00:00`` for a datetime.
+"""
+import json
+
+import attr
+from django.utils.module_loading import import_string
+from opaque_keys import OpaqueKey
+
+from .serializers import serialize
+from .settings.common import get_setting
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_encoders = {}
+
+# orjson would encode datetimes and dataclasses differently than the standard library, so they go through _default
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else None
+)
+
+# Converter of each class that JSON can't represent
+_converters = {}
+
+
+def register_encoder(name, encoder):
+    """
+    Register a JSON encoder, a function that takes the payload data and returns JSON bytes.
+    """
+    _encoders[name] = encoder
+
+
+def _converter(cls):
+    """
+    Get the function converting the objects of a class that JSON can't represent.
+    """
+    if issubclass(cls, OpaqueKey):
+        return str
+    if attr.has(cls):
+        return serialize
+    return str
+
+
+def _default(o):
+    """
+    Encode the objects that JSON can't represent, with the converter of their class.
+    """
+    convert = _converters.get(type(o))
+    if convert is None:
+        convert = _converters[type(o)] = _converter(type(o))
+    return convert(o)
+
+
+def encode_stdlib(data):
+    """
+    Encode the data with the Python standard library.
+    """
+    return json.dumps(data, default=_default).encode('utf-8')
+
+
+def encode_orjson(data):
+    """
+    Encode the data with orjson, falling back to the standard library for what it doesn't support.
+    """
+    try:
+        return orjson.dumps(data, default=_default, option=_ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        # e.g. integers that don't fit in 64 bits
+        return encode_stdlib(data)
+
+
+register_encoder("json", encode_stdlib)
+if orjson is not None:
+    register_encoder("orjson", encode_orjson)
+
+
+def get_encoder(name=None):
+    """
+    Get the encoder with the given name, or the one set in WEBHOOKS_JSON_ENCODER.
+    """
+    name = name or get_setting("WEBHOOKS_JSON_ENCODER")
+    if name == "auto":
+        name = "orjson" if "orjson" in _encoders else "json"
+    if name not in _encoders:
+        register_encoder(name, import_string(name))
+    return _encoders[name]
+
+
+def encode(data):
+    """
+    Encode the data as JSON bytes with the configured encoder.
+    """
+    return get_encoder()(data)
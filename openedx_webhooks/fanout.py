@@ -0,0 +1,154 @@
+"""
+Concurrent calls to webhook URLs.
+
+Calls triggered by the same event run in a thread pool shared by the whole process, so the time spent is the one of
+the slowest call instead of the sum of all of them. The number of requests in flight is limited per process by
+WEBHOOKS_MAX_CONCURRENT_REQUESTS and per destination host by WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST.
+
+Calls to a host without a free slot wait in the queue of the host instead of in the pool, and the thread that ends a
+call to the host makes the next one. A burst of calls to a slow host then only uses as many threads of the pool as
+the host has slots, and calls to other hosts don't wait for it.
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .utils import get_setting
+
+_executor = None
+_global_semaphore = None
+_hosts = {}
+_lock = threading.Lock()
+# Notified when a host has a free slot, for the calls made in the calling thread
+_slot_freed = threading.Condition(_lock)
+
+
+class _Host:
+    """
+    Calls in progress and waiting for a destination host.
+    """
+
+    def __init__(self, limit):
+        """
+        Create the state of a host allowing `limit` calls at the same time.
+        """
+        self.limit = limit
+        self.active = 0
+        # (func, item, future) of the calls waiting for a free slot
+        self.waiting = deque()
+
+
+def _get_executor():
+    """
+    Get the thread pool of the process, creating it the first time.
+    """
+    global _executor, _global_semaphore  # pylint: disable=global-statement
+
+    with _lock:
+        if _executor is None:
+            max_requests = get_setting("WEBHOOKS_MAX_CONCURRENT_REQUESTS")
+            _global_semaphore = threading.BoundedSemaphore(max_requests)
+            _executor = ThreadPoolExecutor(max_workers=max_requests, thread_name_prefix="openedx-webhooks")
+    return _executor
+
+
+def _get_host(url):
+    """
+    Get the state of the host of the url. Must be called holding `_lock`.
+    """
+    host = urlsplit(url).netloc
+    if host not in _hosts:
+        _hosts[host] = _Host(get_setting("WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST"))
+    return _hosts[host]
+
+
+def _call(func, item, future):
+    """
+    Call func(item) once there is a free slot for the process, and set its result in the future.
+    """
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        with _global_semaphore:
+            future.set_result(func(item))
+    except Exception as e:  # pylint: disable=broad-except
+        future.set_exception(e)
+
+
+def _next_call(host):
+    """
+    Get the next call waiting for the host, which takes the slot of the call that ended, or free the slot.
+    """
+    with _lock:
+        if host.waiting:
+            return host.waiting.popleft()
+        host.active -= 1
+        _slot_freed.notify_all()
+        return None
+
+
+def _drain(host, call):
+    """
+    Make the call, and then the calls waiting for the host, in the slot of the host taken for the first one.
+    """
+    while call is not None:
+        _call(*call)
+        call = _next_call(host)
+
+
+def fan_out(func, items, url):
+    """
+    Call func(item) for all the items concurrently.
+
+    `url(item)` must return the URL called for the item, to limit the concurrent requests per host.
+    Returns the futures of the calls in the same order as the items. Exceptions raised by func are raised when
+    getting the result of the corresponding future.
+    """
+    items = list(items)
+    executor = _get_executor()
+
+    if len(items) == 1:
+        # Don't pay a thread switch when there is nothing to run in parallel
+        future = Future()
+        item_url = url(items[0])
+        with _lock:
+            host = _get_host(item_url)
+            while host.active >= host.limit:
+                _slot_freed.wait()
+            host.active += 1
+        _call(func, items[0], future)
+        call = _next_call(host)
+        if call is not None:
+            # The calls waiting for the host go on in the pool, not in the calling thread
+            _get_executor().submit(_drain, host, call)
+        return [future]
+
+    futures = []
+    for item in items:
+        call = (func, item, Future())
+        futures.append(call[2])
+        item_url = url(item)
+        with _lock:
+            host = _get_host(item_url)
+            if host.active >= host.limit:
+                host.waiting.append(call)
+                continue
+            host.active += 1
+        executor.submit(_drain, host, call)
+    return futures
+
+
+def shutdown():
+    """
+    Wait for the calls in progress and stop the thread pool.
+    """
+    global _executor  # pylint: disable=global-statement
+
+    # The lock is released while waiting, as the calls in progress take it to end
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    with _lock:
+        _hosts.clear()
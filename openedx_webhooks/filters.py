@@ -15,7 +15,10 @@ StudentRegistrationRequested,
 """
 import json
 import logging
+import time
+from concurrent import futures
 from datetime import datetime
+from functools import partial
 
 import requests.exceptions
 from common.djangoapps.student.models import UserProfile  # pylint: disable=import-error
@@ -45,8 +48,12 @@ from openedx_filters.learning.filters import (
     VerticalBlockRenderCompleted,
 )
 
-from .models import Webfilter
-from .utils import object_serializer, send
+from . import batching, completion, request_cache, response_cache
+from .conditions import matches
+from .config import get_webfilters
+from .fanout import fan_out
+from .projection import compile_fields, project
+from .utils import Payload, StreamingPayload, get_setting, object_serializer, send
 
 # In Sumac add:
 
@@ -73,48 +80,150 @@ def fix_dict_keys(d: dict):
     return r
 
 
-def _process_filter(webfilters, data, exception=None):  # pylint: disable=too-many-statements
+class PipelineTimeout(requests.exceptions.Timeout):
+    """
+    A webfilter was not called or waited for because the time budget of its pipeline was spent.
+    """
+
+
+def _get_pipeline_deadline(event):
+    """
+    Get the monotonic time by which all the webfilters of the event must be done, or None if there is no limit.
+    """
+    budget = get_setting("WEBHOOKS_WEBFILTER_PIPELINE_TIMEOUT")
+    if isinstance(budget, dict):
+        budget = budget.get(event)
+    if budget is None:
+        return None
+    return time.monotonic() + budget
+
+
+def _process_filter(webfilters, data, exception=None, serializer=None,  # pylint: disable=too-many-statements
+                    stream=None, get_batch=None):
     """
     Process all events with user data.
+
+    When given, `serializer` is applied to the data after keeping only the fields requested by each webfilter.
+    `stream` is the key of a QuerySet in the data, whose rows are streamed to the webfilters in chunks.
+    `get_batch` returns the batch of the data, called by the webfilters that batch children (see `batching`).
     """
     response_data = {}
     response_exceptions = {}
 
-    # Convert model objects to dicts, and remove '_state'
-    payload = {}
-    for key, value in data.items():
+    # Leave out the webfilters whose condition doesn't match before serializing anything
+    webfilters = [webfilter for webfilter in webfilters if matches(webfilter.condition, data)]
+    if not webfilters:
+        return response_data, response_exceptions
+
+    # All webfilters of a pipeline belong to the same event
+    event_metadata = {
+        'event_type': webfilters[0].event if webfilters else None,
+        'time': str(datetime.now())
+    }
+
+    deadline = _get_pipeline_deadline(event_metadata['event_type'])
+    # Get the request scope in this thread, as the webfilters may be called in other threads
+    scope = request_cache.get_scope()
+
+    def _build_payload(fields, data):
+        tree = compile_fields(fields)
+        selected = {key: value for key, value in data.items() if key != stream} if stream else data
+        if tree is not None:
+            selected = project(selected, tree)
+        if serializer is not None:
+            selected = serializer(selected)
+
+        # Convert model objects to dicts, and remove '_state'
+        payload = {}
+        for key, value in selected.items():
+
+            if isinstance(value, models.Model):
+                payload[key] = value.__dict__.copy()
+                payload[key].pop('_state', None)
+            elif isinstance(value, dict):
+                payload[key] = fix_dict_keys(value)
+            else:
+                payload[key] = value
 
-        if isinstance(value, models.Model):
-            payload[key] = value.__dict__.copy()
-            payload[key].pop('_state', None)
-        elif isinstance(value, dict):
-            payload[key] = fix_dict_keys(value)
-        else:
-            payload[key] = value
+        payload['event_metadata'] = event_metadata
+        if stream and (tree is None or stream in tree):
+            # The requested fields of the rows, or all of them
+            names = tree[stream] if tree is not None else None
+            return StreamingPayload(payload, stream, data[stream].values(*(names or ())))
+        return Payload(payload)
 
+    # Serialize each payload only once for all the webfilters requesting the same fields
+    payloads = {}
     for webfilter in webfilters:
-        logger.info(f"{webfilter.event} webhook filter triggered to {webfilter.webhook_url}")
-
-        # Add event metadata
-        payload['event_metadata'] = {
-            'event_type': webfilter.event,
-            'time': str(datetime.now())
-        }
+        if webfilter.payload_fields not in payloads:
+            payloads[webfilter.payload_fields] = _build_payload(webfilter.payload_fields, data)
+
+    batch = get_batch() if get_batch and scope is not None and any(w.batch_children for w in webfilters) else None
+
+    def _send(webfilter):
+        payload = payloads[webfilter.payload_fields]
+        cached = scope.get(webfilter, payload) if scope is not None else None
+        if cached is None:
+            cached = response_cache.get(webfilter, payload)
+        if cached is not None:
+            return cached
+
+        timeout = (webfilter.connect_timeout, webfilter.read_timeout)
+        if deadline is not None:
+            # Don't wait for the webfilter longer than the time left for the pipeline
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PipelineTimeout(f"Time budget of the {webfilter.event} webfilters exhausted before calling "
+                                      f"{webfilter.webhook_url}")
+            timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+
+        if webfilter.batch_children and batch is not None:
+            response = batching.get_response(scope, webfilter, batch, _build_payload, timeout)
+            if response is not None:
+                return response
 
+        logger.info(f"{webfilter.event} webhook filter triggered to {webfilter.webhook_url}")
+        response = send(
+            webfilter.webhook_url,
+            payload,
+            www_form_urlencoded=webfilter.use_www_form_encoding,
+            timeout=timeout,
+            compression=webfilter.request_compression,
+        )
+        response_cache.store(webfilter, payload, response)
+        if scope is not None:
+            scope.store(webfilter, payload, response)
+        return response
+
+    def _wait(future, webfilter):
         try:
-            # Send the request to the webhook URL
-            response = send(
-                webfilter.webhook_url,
-                payload,
-                www_form_urlencoded=webfilter.use_www_form_encoding,
-            )
+            return future.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+        except futures.TimeoutError as e:
+            raise PipelineTimeout(f"Time budget of the {webfilter.event} webfilters exhausted waiting for "
+                                  f"{webfilter.webhook_url}") from e
+
+    # QuerySets are streamed in this thread, which has the database connection and transaction of the caller
+    if get_setting("WEBHOOKS_CONCURRENT_WEBFILTERS") and not stream:
+        # Call all the webfilters at once. The responses are still processed in the configured order,
+        # so the result is the same as calling them one after the other.
+        responses = [
+            partial(_wait, future, webfilter)
+            for future, webfilter in zip(fan_out(_send, webfilters, url=lambda w: w.webhook_url), webfilters)
+        ]
+    else:
+        responses = [partial(_send, webfilter) for webfilter in webfilters]
+
+    for webfilter, get_response in zip(webfilters, responses):
+        try:
+            # Get the response of the webhook URL
+            response = get_response()
 
         except requests.exceptions.RequestException as e:
             if webfilter.halt_on_request_exception and exception:
-                logger.info(f"Halting on request exception '{e.strerror}'. "
+                logger.info(f"Halting on request exception '{e.strerror or e}'. "
                             f"{webfilter.event} webhook filter triggered to {webfilter.webhook_url}")
                 raise exception(
-                    message=e.strerror,
+                    message=e.strerror or str(e),
                     redirect_to=webfilter.redirect_on_request_exception,
                 ) from e
             logger.info(f"Not halting on request exception '{e}'."
@@ -179,6 +288,25 @@ def _process_filter(webfilters, data, exception=None):  # pylint: disable=too-ma
     return response_data, response_exceptions
 
 
+def _get_vertical_children(data):
+    """
+    Get the batch of a child block render.
+
+    The batch has the ids of its vertical and of the child, and a function listing the data of all the children. The
+    children are only listed by the first child of the vertical, which calls the webfilter for all of them. The
+    context of the child being rendered is used for all the children. Returns None if the vertical is unknown.
+    """
+    block = data['block']
+    parent = block.get_parent() if hasattr(block, 'get_parent') else None
+    if parent is None:
+        return None
+
+    def get_children():
+        return [(str(child.scope_ids.usage_id), {**data, 'block': child}) for child in parent.get_children()]
+
+    return str(parent.scope_ids.usage_id), str(block.scope_ids.usage_id), get_children
+
+
 def update_model(instance, data):
     """Update a model with data."""
     if isinstance(data, dict):
@@ -352,7 +480,7 @@ class StudentLoginRequestedWebFilter(PipelineStep):
         """Execute the filter."""
         event = "StudentLoginRequested"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event for user {user}")
@@ -463,7 +591,7 @@ class StudentRegistrationRequestedWebFilter(PipelineStep):
     def run_filter(self, form_data):  # pylint: disable=arguments-differ
         """Execute the filter."""
         event = "StudentRegistrationRequested"
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event. Form data: {form_data}.")
@@ -521,7 +649,7 @@ class AccountSettingsRenderStartedWebFilter(PipelineStep):
         """
         event = "AccountSettingsRenderStarted"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -644,7 +772,7 @@ class CourseEnrollmentStartedWebFilter(PipelineStep):
         """
         event = "CourseEnrollmentStarted"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event. User: {user}, course: {course_key}, mode: {mode}.")
@@ -765,7 +893,7 @@ class CourseUnenrollmentStartedWebFilter(PipelineStep):
         """
         event = "CourseUnenrollmentStarted"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event. Enrollment: {enrollment}")
@@ -913,7 +1041,7 @@ class CertificateCreationRequestedWebFilter(PipelineStep):
         """
         event = "CertificateCreationRequested"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             user = data.get('user')
@@ -924,10 +1052,13 @@ class CertificateCreationRequestedWebFilter(PipelineStep):
             logger.info(f"Webfilter for {event} event. User: {user}, course: {course_key}, status: {status}")
 
             data["profile"] = user.profile
-            data["completion_summary"] = get_course_blocks_completion_summary(course_key, user)
+            if any(webfilter.include_completion_summary for webfilter in webfilters):
+                data["completion_summary"] = completion.get_completion_summary(
+                    course_key, user, get_course_blocks_completion_summary)
 
             content, exceptions = _process_filter(webfilters=webfilters,
-                                                  data=object_serializer(data),
+                                                  data=data,
+                                                  serializer=object_serializer,
                                                   exception=CertificateCreationRequested.PreventCertificateCreation)
 
             update_model(user, content.get('user'))
@@ -1060,19 +1191,20 @@ class CertificateRenderStartedWebFilter(PipelineStep):
         """
         event = "CertificateRenderStarted"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
 
-            user = get_user_model().objects.get(id=context.get('accomplishment_user_id'))
-            course_key = CourseKey.from_string(context.get('course_id'))
-
             data = {
                 "context": context,
                 "custom_template": custom_template,
-                "completion_summary": get_course_blocks_completion_summary(course_key, user)
             }
+            if any(webfilter.include_completion_summary for webfilter in webfilters):
+                user = get_user_model().objects.get(id=context.get('accomplishment_user_id'))
+                course_key = CourseKey.from_string(context.get('course_id'))
+                data["completion_summary"] = completion.get_completion_summary(
+                    course_key, user, get_course_blocks_completion_summary)
 
             content, exceptions = _process_filter(webfilters=webfilters,
                                                   data=data,
@@ -1197,7 +1329,7 @@ class CohortChangeRequestedWebFilter(PipelineStep):
         """
         event = "CohortChangeRequested"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1329,7 +1461,7 @@ class CohortAssignmentRequestedWebFilter(PipelineStep):
         """
         event = "CohortAssignmentRequested"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1457,7 +1589,7 @@ class CourseAboutRenderStartedWebFilter(PipelineStep):
         """
         event = "CourseAboutRenderStarted"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1592,7 +1724,7 @@ class DashboardRenderStartedWebFilter(PipelineStep):
         """
         event = "DashboardRenderStarted"
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1646,14 +1778,16 @@ class VerticalBlockChildRenderStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
 
             content, exceptions = _process_filter(webfilters=webfilters,
-                                                  data=object_serializer(data),
-                                                  exception=VerticalBlockChildRenderStarted.PreventChildBlockRender)
+                                                  data=data,
+                                                  serializer=object_serializer,
+                                                  exception=VerticalBlockChildRenderStarted.PreventChildBlockRender,
+                                                  get_batch=partial(_get_vertical_children, data))
 
             return_data['context'].update(content.get('context', {}))
 
@@ -1690,17 +1824,16 @@ class CourseEnrollmentQuerysetRequestedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
 
-            return_data['enrollments'] = list(data['enrollments'].values())
-
             content, exceptions = _process_filter(
                 webfilters=webfilters,
                 data=data,
-                exception=CourseEnrollmentQuerysetRequested.PreventEnrollmentQuerysetRequest)
+                exception=CourseEnrollmentQuerysetRequested.PreventEnrollmentQuerysetRequest,
+                stream='enrollments')
 
             return_data['enrollments'] = data['enrollments'].filter(content.get('filter', {}))
 
@@ -1735,7 +1868,7 @@ class RenderXBlockStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1794,7 +1927,7 @@ class VerticalBlockRenderCompletedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1838,7 +1971,7 @@ class CourseHomeUrlCreationStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1883,7 +2016,7 @@ class CourseEnrollmentAPIRenderStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1929,7 +2062,7 @@ class CourseRunAPIRenderStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -1968,7 +2101,7 @@ class InstructorDashboardRenderStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -2014,7 +2147,7 @@ class ORASubmissionViewRenderStartedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -2058,7 +2191,7 @@ class IDVPageURLRequestedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -2097,7 +2230,7 @@ class CourseAboutPageURLRequestedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -2139,14 +2272,13 @@ class ScheduleQuerySetRequestedWebFilter(PipelineStep):
         event = type(self).__name__[:-9]
 
         return_data = data.copy()
-        return_data['schedules'] = list(data['schedules'].values())
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
 
-            content, _ = _process_filter(webfilters=webfilters, data=data)
+            content, _ = _process_filter(webfilters=webfilters, data=data, stream='schedules')
 
             return_data['schedules'] = data['schedules'].filter(content.get('filter', {}))
 
@@ -2182,7 +2314,7 @@ class LMSPageURLRequestedWebFilter(PipelineStep):
 
         return_data = data.copy()
 
-        webfilters = Webfilter.objects.filter(enabled=True, event=event)
+        webfilters = get_webfilters(event)
 
         if webfilters:
             logger.info(f"Webfilter for {event} event.")
@@ -0,0 +1,86 @@
+"""
+Ledger of the events processed for each webhook, to deliver every event at most once per webhook.
+
+Events are identified by the id of their metadata. When WEBHOOKS_DEDUPLICATE_EVENTS is enabled, processing an event
+for a webhook inserts a `WebhookLedgerEntry`, which is unique per event id and webhook. If the insert fails, the
+event was already processed, e.g. by another worker or because the signal was sent again, and it is skipped.
+
+The insert itself is the check, so events seen for the first time (by far the most common case) cost a single
+query. The pairs processed recently are also remembered in each process, so duplicates seen by the same process
+don't query the database at all. New entries are only remembered once the transaction that inserted them commits:
+if it is rolled back, the event was not delivered and can be processed again.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import WebhookLedgerEntry
+from .utils import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Recently processed (event id, webhook id) pairs, least recently used first
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _remember(key):
+    with _recent_lock:
+        _recent[key] = True
+        _recent.move_to_end(key)
+        while len(_recent) > get_setting("WEBHOOKS_LEDGER_CACHE_SIZE"):
+            _recent.popitem(last=False)
+
+
+def _seen_recently(key):
+    with _recent_lock:
+        if key in _recent:
+            _recent.move_to_end(key)
+            return True
+    return False
+
+
+def claim(event_id, webhook):
+    """
+    Record that the event is being processed for the webhook.
+
+    Returns False if it was already processed, in which case it must not be delivered again.
+    """
+    key = (str(event_id), webhook.pk)
+    if _seen_recently(key):
+        logger.info(f"Skipping duplicate event {event_id} for {webhook.webhook_url}")
+        return False
+
+    try:
+        with transaction.atomic():
+            WebhookLedgerEntry.objects.create(event_id=event_id, webhook=webhook)
+    except IntegrityError:
+        logger.info(f"Skipping event {event_id} already processed for {webhook.webhook_url}")
+        _remember(key)
+        return False
+
+    transaction.on_commit(lambda: _remember(key))
+    return True
+
+
+def prune():
+    """
+    Delete the ledger entries older than WEBHOOKS_LEDGER_RETENTION seconds.
+
+    Returns the number of entries deleted.
+    """
+    limit = timezone.now() - timedelta(seconds=get_setting("WEBHOOKS_LEDGER_RETENTION"))
+    deleted, _ = WebhookLedgerEntry.objects.filter(created__lt=limit).delete()
+    return deleted
+
+
+def clear_cache():
+    """
+    Forget the pairs processed recently by this process.
+    """
+    with _recent_lock:
+        _recent.clear()
@@ -0,0 +1,74 @@
+"""
+Send the webhook deliveries stored in the outbox.
+
+Run it once (e.g. from a cron job) or keep it running as a worker with ``--loop``::
+
+    ./manage.py lms dispatch_webhooks --loop --interval 1
+
+It also deletes the delivered and failed deliveries older than WEBHOOKS_DELIVERY_RETENTION, and the entries of the
+events ledger older than WEBHOOKS_LEDGER_RETENTION, when it starts and then every hour.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from openedx_webhooks import deliveries, ledger
+from openedx_webhooks.deliveries import dispatch_pending
+
+logger = logging.getLogger(__name__)
+
+# Seconds between deletions of old ledger entries
+LEDGER_PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    """
+    Drain the webhook deliveries outbox.
+    """
+
+    help = "Send the pending webhook deliveries stored in the outbox."
+
+    def add_arguments(self, parser):
+        """
+        Add the command arguments.
+        """
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help="Maximum number of deliveries claimed at once. Defaults to WEBHOOKS_DISPATCH_BATCH_SIZE.",
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep polling the outbox instead of exiting when it is empty.",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls when the outbox is empty. Only used with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Dispatch the pending deliveries.
+        """
+        total = 0
+        pruned_at = None
+        while True:
+            if pruned_at is None or time.monotonic() - pruned_at > LEDGER_PRUNE_INTERVAL:
+                logger.info(f"Deleted {deliveries.prune()} old deliveries")
+                logger.info(f"Deleted {ledger.prune()} old ledger entries")
+                pruned_at = time.monotonic()
+
+            dispatched = dispatch_pending(limit=options['batch_size'])
+            total += dispatched
+            if dispatched:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(f"Dispatched {total} webhook deliveries.")
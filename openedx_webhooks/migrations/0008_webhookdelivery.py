@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-18 18:26
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0007_alter_webfilter_event'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webfilter',
+            name='event',
+            field=models.CharField(choices=[('StudentLoginRequested', 'Student Login Requested'), ('StudentRegistrationRequested', 'Student Registration Requested'), ('StudentSettingsRenderStarted', 'Student Settings Render Started'), ('CourseEnrollmentStarted', 'Course Enrollment Started'), ('CourseUnenrollmentStarted', 'Course Unenrollment Started'), ('CertificateCreationRequested', 'Certificate Creation Requested'), ('CertificateRenderStarted', 'Certificate Render Started'), ('CohortChangeRequested', 'Cohort Change Requested'), ('CohortAssignmentRequested', 'Cohort Assignment Requested'), ('CourseAboutRenderStarted', 'Course About Render Started'), ('DashboardRenderStarted', 'Dashboard Render Started'), ('VerticalBlockChildRenderStarted', 'Vertical Block Child Render Started'), ('CourseEnrollmentQuerysetRequested', 'Course Enrollment Queryset Requested'), ('XblockRenderStarted', 'Xblock Render Started'), ('VerticalBlockRenderCompleted', 'Vertical Block Render Completed'), ('CourseHomepageUrlCreationStarted', 'Course Homepage Url Creation Started'), ('HomeEnrollmentApiRendered', 'Home Enrollment Api Rendered'), ('HomeCourserunApiRenderedStarted', 'Home Courserun Api Rendered Started'), ('InstructorDashboardRenderStarted', 'Instructor Dashboard Render Started'), ('OraSubmissionViewRenderStarted', 'Ora Submission View Render Started'), ('IdvPageUrlRequested', 'Idv Page Url Requested'), ('CourseAboutPageUrlRequested', 'Course About Page Url Requested'), ('ScheduleQuerysetRequested', 'Schedule Queryset Requested'), ('AuthoringLmsPageUrlRequested', 'Authoring Lms Page Url Requested')], default='', help_text='Event type', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='webhook',
+            name='event',
+            field=models.CharField(choices=[('COURSE_CATALOG_INFO_CHANGED', 'Course catalog info changed'), ('XBLOCK_CREATED', 'Xblock created'), ('XBLOCK_UPDATED', 'Xblock updated'), ('XBLOCK_PUBLISHED', 'Xblock published'), ('XBLOCK_DELETED', 'Xblock deleted'), ('XBLOCK_DUPLICATED', 'Xblock duplicated'), ('COURSE_CERTIFICATE_CONFIG_CHANGED', 'Course certificate config changed'), ('COURSE_CERTIFICATE_CONFIG_DELETED', 'Course certificate config deleted'), ('COURSE_CREATED', 'Course created'), ('CONTENT_LIBRARY_CREATED', 'Content library created'), ('CONTENT_LIBRARY_UPDATED', 'Content library updated'), ('CONTENT_LIBRARY_DELETED', 'Content library deleted'), ('LIBRARY_BLOCK_CREATED', 'Library block created'), ('LIBRARY_BLOCK_UPDATED', 'Library block updated'), ('LIBRARY_BLOCK_DELETED', 'Library block deleted'), ('LIBRARY_BLOCK_PUBLISHED', 'Library block published'), ('CONTENT_OBJECT_TAGS_CHANGED', 'Content object tags changed'), ('CONTENT_OBJECT_ASSOCIATIONS_CHANGED', 'Content object associations changed'), ('LIBRARY_COLLECTION_CREATED', 'Library collection created'), ('LIBRARY_COLLECTION_UPDATED', 'Library collection updated'), ('LIBRARY_COLLECTION_DELETED', 'Library collection deleted'), ('LIBRARY_CONTAINER_CREATED', 'Library container created'), ('LIBRARY_CONTAINER_UPDATED', 'Library container updated'), ('LIBRARY_CONTAINER_DELETED', 'Library container deleted'), ('LIBRARY_CONTAINER_PUBLISHED', 'Library container published'), ('COURSE_IMPORT_COMPLETED', 'Course import completed'), ('COURSE_RERUN_COMPLETED', 'Course rerun completed'), ('STUDENT_REGISTRATION_COMPLETED', 'Student registration completed'), ('SESSION_LOGIN_COMPLETED', 'Session login completed'), ('COURSE_ENROLLMENT_CREATED', 'Course enrollment created'), ('COURSE_ENROLLMENT_CHANGED', 'Course enrollment changed'), ('COURSE_UNENROLLMENT_COMPLETED', 'Course unenrollment completed'), ('CERTIFICATE_CREATED', 'Certificate created'), ('CERTIFICATE_CHANGED', 'Certificate changed'), ('CERTIFICATE_REVOKED', 'Certificate revoked'), ('COHORT_MEMBERSHIP_CHANGED', 'Cohort membership changed'), ('COURSE_DISCUSSIONS_CHANGED', 'Course discussions changed'), ('PROGRAM_CERTIFICATE_REVOKED', 'Program certificate revoked'), ('PROGRAM_CERTIFICATE_AWARDED', 'Program certificate awarded'), ('PERSISTENT_GRADE_SUMMARY_CHANGED', 'Persistent grade summary changed'), ('XBLOCK_SKILL_VERIFIED', 'Xblock skill verified'), ('USER_NOTIFICATION_REQUESTED', 'User notification requested'), ('EXAM_ATTEMPT_SUBMITTED', 'Exam attempt submitted'), ('EXAM_ATTEMPT_REJECTED', 'Exam attempt rejected'), ('EXAM_ATTEMPT_VERIFIED', 'Exam attempt verified'), ('EXAM_ATTEMPT_ERRORED', 'Exam attempt errored'), ('EXAM_ATTEMPT_RESET', 'Exam attempt reset'), ('COURSE_ACCESS_ROLE_ADDED', 'Course access role added'), ('COURSE_ACCESS_ROLE_REMOVED', 'Course access role removed'), ('FORUM_THREAD_CREATED', 'Forum thread created'), ('FORUM_THREAD_RESPONSE_CREATED', 'Forum thread response created'), ('FORUM_RESPONSE_COMMENT_CREATED', 'Forum response comment created'), ('COURSE_NOTIFICATION_REQUESTED', 'Course notification requested'), ('ORA_SUBMISSION_CREATED', 'Ora submission created'), ('COURSE_PASSING_STATUS_UPDATED', 'Course passing status updated'), ('CCX_COURSE_PASSING_STATUS_UPDATED', 'Ccx course passing status updated'), ('BADGE_AWARDED', 'Badge awarded'), ('BADGE_REVOKED', 'Badge revoked'), ('IDV_ATTEMPT_CREATED', 'Idv attempt created'), ('IDV_ATTEMPT_PENDING', 'Idv attempt pending'), ('IDV_ATTEMPT_APPROVED', 'Idv attempt approved'), ('IDV_ATTEMPT_DENIED', 'Idv attempt denied'), ('EXTERNAL_GRADER_SCORE_SUBMITTED', 'External grader score submitted'), ('LTI_PROVIDER_LAUNCH_SUCCESS', 'Lti provider launch success')], default='', help_text='Event type', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('event', models.CharField(help_text='Event type', max_length=50)),
+                ('payload', models.TextField(help_text='JSON encoded payload to send')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('delivered', 'Delivered'), ('failed', 'Failed')], db_index=True, default='pending', help_text='Delivery status', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of times the delivery was attempted')),
+                ('status_code', models.PositiveIntegerField(blank=True, help_text='Status code of the last response', null=True)),
+                ('last_error', models.TextField(blank=True, default='', help_text='Error of the last failed attempt')),
+                ('delivered_at', models.DateTimeField(blank=True, help_text='Date and time of the successful delivery', null=True)),
+                ('webhook', models.ForeignKey(help_text='Webhook to deliver the payload to', on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='openedx_webhooks.webhook')),
+            ],
+            options={
+                'verbose_name_plural': 'webhook deliveries',
+            },
+        ),
+    ]
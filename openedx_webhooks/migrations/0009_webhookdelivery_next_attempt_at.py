@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0008_webhookdelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Date and time of the next attempt of a failed delivery', null=True),
+        ),
+    ]
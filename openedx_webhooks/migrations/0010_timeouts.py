@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 18:32
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0009_webhookdelivery_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='connect_timeout',
+            field=models.FloatField(default=10, help_text='Seconds to wait for the connection to the server to be established', validators=[django.core.validators.MinValueValidator(0.001)], verbose_name='Connect timeout'),
+        ),
+        migrations.AddField(
+            model_name='webfilter',
+            name='read_timeout',
+            field=models.FloatField(default=10, help_text='Seconds to wait for the server to send a response', validators=[django.core.validators.MinValueValidator(0.001)], verbose_name='Read timeout'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='connect_timeout',
+            field=models.FloatField(default=10, help_text='Seconds to wait for the connection to the server to be established', validators=[django.core.validators.MinValueValidator(0.001)], verbose_name='Connect timeout'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='read_timeout',
+            field=models.FloatField(default=10, help_text='Seconds to wait for the server to send a response', validators=[django.core.validators.MinValueValidator(0.001)], verbose_name='Read timeout'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 18:37
+
+import openedx_webhooks.projection
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0010_timeouts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='payload_fields',
+            field=models.TextField(blank=True, default='', help_text='Dotted paths of the fields to send, separated by commas or new lines, e.g. user.email, course.display_name. Leave empty to send all the data.', validators=[openedx_webhooks.projection.validate_fields], verbose_name='Payload fields'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='payload_fields',
+            field=models.TextField(blank=True, default='', help_text='Dotted paths of the event data fields to send, separated by commas or new lines, e.g. user.pii.email, course_key. Leave empty to send all the data. The event metadata is always sent.', validators=[openedx_webhooks.projection.validate_fields], verbose_name='Payload fields'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 18:39
+
+import openedx_webhooks.conditions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0011_payload_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='condition',
+            field=models.TextField(blank=True, default='', help_text="Only call the URL when the data matches this expression, e.g. course_key.org == 'edX'. Leave empty to call it for all the events.", validators=[openedx_webhooks.conditions.validate_condition], verbose_name='Condition'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='condition',
+            field=models.TextField(blank=True, default='', help_text="Only call the URL when the event data matches this expression, e.g. course.course_key.org in {'edX', 'OpenCraft'} and mode == 'verified'. Leave empty to call it for all the events.", validators=[openedx_webhooks.conditions.validate_condition], verbose_name='Condition'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0012_condition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='request_compression',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('gzip', 'gzip'), ('deflate', 'deflate')], default='', help_text='Compress the JSON data sent, if it is bigger than WEBHOOKS_COMPRESSION_MIN_SIZE bytes. The server must support the chosen content encoding.', max_length=10, verbose_name='Request compression'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='request_compression',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('gzip', 'gzip'), ('deflate', 'deflate')], default='', help_text='Compress the JSON data sent, if it is bigger than WEBHOOKS_COMPRESSION_MIN_SIZE bytes. The server must support the chosen content encoding.', max_length=10, verbose_name='Request compression'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 18:43
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0013_request_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhook',
+            name='batch_format',
+            field=models.CharField(blank=True, choices=[('', 'No batching'), ('json', 'JSON array'), ('ndjson', 'Newline delimited JSON')], default='', help_text='Send many events in one request, as a JSON array or as newline delimited JSON. Batched deliveries are sent by the dispatcher.', max_length=10, verbose_name='Batch deliveries'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='batch_max_age',
+            field=models.FloatField(default=10, help_text='Send the batch when its oldest event has waited this number of seconds', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Batch maximum age'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='batch_max_bytes',
+            field=models.PositiveIntegerField(default=1000000, help_text='Send the batch when the size of its events reaches this number of bytes', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Batch maximum bytes'),
+        ),
+        migrations.AddField(
+            model_name='webhook',
+            name='batch_max_items',
+            field=models.PositiveIntegerField(default=100, help_text='Send the batch when it has this number of events', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Batch maximum items'),
+        ),
+    ]
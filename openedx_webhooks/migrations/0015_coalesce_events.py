@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 18:45
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0014_webhook_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhook',
+            name='coalesce_window',
+            field=models.FloatField(default=0, help_text='Seconds during which the events of the same block, library or course are merged into one delivery with the latest data. Coalesced deliveries are sent by the dispatcher. Set it to 0 to send all the events.', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Coalesce window'),
+        ),
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='coalesced_events',
+            field=models.PositiveIntegerField(default=1, help_text='Number of events merged in this delivery'),
+        ),
+        migrations.AddField(
+            model_name='webhookdelivery',
+            name='entity_key',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Key of the block, library or course of coalesced events', max_length=255),
+        ),
+    ]
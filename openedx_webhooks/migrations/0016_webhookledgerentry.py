@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 18:46
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0015_coalesce_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookLedgerEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('event_id', models.UUIDField(help_text='Id of the event, from its metadata')),
+                ('webhook', models.ForeignKey(help_text='Webhook the event was processed for', on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='openedx_webhooks.webhook')),
+            ],
+            options={
+                'verbose_name_plural': 'webhook ledger entries',
+                'indexes': [models.Index(fields=['created'], name='webhooks_ledger_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event_id', 'webhook'), name='openedx_webhooks_unique_event_webhook')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 18:52
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0016_webhookledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='response_cache_ttl',
+            field=models.FloatField(default=0, help_text='Seconds to reuse the successful responses of the URL for the same data, or less if the server sets a shorter Cache-Control max-age. Only for webfilters whose response depends only on the data sent. Set it to 0 to call the URL every time.', validators=[django.core.validators.MinValueValidator(0)], verbose_name='Response cache TTL'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0017_response_cache_ttl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='batch_children',
+            field=models.BooleanField(default=False, help_text='Call the URL once for all the children of a vertical, with a JSON array of their data, instead of once for each child. The response must be a JSON array with the response of each child, in the same order. Only for VerticalBlockChildRenderStarted webfilters.', verbose_name='Batch children'),
+        ),
+    ]
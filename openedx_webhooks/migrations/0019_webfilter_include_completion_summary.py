@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0018_webfilter_batch_children'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='include_completion_summary',
+            field=models.BooleanField(default=True, help_text='Add the completion summary of the user in the course to the data. It is only computed when at least one webfilter of the event includes it. Only for CertificateCreationRequested and CertificateRenderStarted webfilters.', verbose_name='Include completion summary'),
+        ),
+    ]
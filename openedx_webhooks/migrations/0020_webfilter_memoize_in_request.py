@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('openedx_webhooks', '0019_webfilter_include_completion_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webfilter',
+            name='memoize_in_request',
+            field=models.BooleanField(default=False, help_text='Reuse the response of the URL for the next identical data sent during the same request, e.g. when the webfilter runs for each block of a page. Only for webfilters whose response depends only on the data sent.', verbose_name='Reuse responses within a request'),
+        ),
+    ]
@@ -9,11 +9,14 @@ date:           May 2023
 usage:          Django models for Open edX signals webhooks
 """
 
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.translation import gettext as _
 from model_utils.models import TimeStampedModel
 
 from .apps import signals
+from .conditions import validate_condition
+from .projection import validate_fields
 from .settings.common import plugin_settings
 
 
@@ -28,6 +31,13 @@ plugin_settings(fake_settings)
 
 filters = fake_settings.OPEN_EDX_FILTERS_CONFIG
 
+# Content encodings to compress request bodies
+COMPRESSION_CHOICES = (
+    ('', _("None")),
+    ('gzip', 'gzip'),
+    ('deflate', 'deflate'),
+)
+
 
 class Webhook(TimeStampedModel):
     """
@@ -36,6 +46,15 @@ class Webhook(TimeStampedModel):
     .. no_pii:
     """
 
+    BATCH_JSON = 'json'
+    BATCH_NDJSON = 'ndjson'
+
+    BATCH_FORMAT_CHOICES = (
+        ('', _("No batching")),
+        (BATCH_JSON, _("JSON array")),
+        (BATCH_NDJSON, _("Newline delimited JSON")),
+    )
+
     signal_list = []
     for signal_app, signal_app_list in signals.items():
         signal_list += signal_app_list
@@ -73,6 +92,90 @@ class Webhook(TimeStampedModel):
         help_text=_("When enabled, data will be sent in form format, instead of JSON")
     )
 
+    connect_timeout = models.FloatField(
+        default=10,
+        validators=[MinValueValidator(0.001)],
+        verbose_name=_("Connect timeout"),
+        help_text=_("Seconds to wait for the connection to the server to be established")
+    )
+
+    read_timeout = models.FloatField(
+        default=10,
+        validators=[MinValueValidator(0.001)],
+        verbose_name=_("Read timeout"),
+        help_text=_("Seconds to wait for the server to send a response")
+    )
+
+    request_compression = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+        choices=COMPRESSION_CHOICES,
+        verbose_name=_("Request compression"),
+        help_text=_("Compress the JSON data sent, if it is bigger than WEBHOOKS_COMPRESSION_MIN_SIZE bytes. "
+                    "The server must support the chosen content encoding.")
+    )
+
+    coalesce_window = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name=_("Coalesce window"),
+        help_text=_("Seconds during which the events of the same block, library or course are merged into one "
+                    "delivery with the latest data. Coalesced deliveries are sent by the dispatcher. "
+                    "Set it to 0 to send all the events.")
+    )
+
+    batch_format = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+        choices=BATCH_FORMAT_CHOICES,
+        verbose_name=_("Batch deliveries"),
+        help_text=_("Send many events in one request, as a JSON array or as newline delimited JSON. "
+                    "Batched deliveries are sent by the dispatcher.")
+    )
+
+    batch_max_items = models.PositiveIntegerField(
+        default=100,
+        validators=[MinValueValidator(1)],
+        verbose_name=_("Batch maximum items"),
+        help_text=_("Send the batch when it has this number of events")
+    )
+
+    batch_max_bytes = models.PositiveIntegerField(
+        default=1000000,
+        validators=[MinValueValidator(1)],
+        verbose_name=_("Batch maximum bytes"),
+        help_text=_("Send the batch when the size of its events reaches this number of bytes")
+    )
+
+    batch_max_age = models.FloatField(
+        default=10,
+        validators=[MinValueValidator(0)],
+        verbose_name=_("Batch maximum age"),
+        help_text=_("Send the batch when its oldest event has waited this number of seconds")
+    )
+
+    condition = models.TextField(
+        blank=True,
+        default='',
+        validators=[validate_condition],
+        verbose_name=_("Condition"),
+        help_text=_("Only call the URL when the event data matches this expression, e.g. "
+                    "course.course_key.org in {'edX', 'OpenCraft'} and mode == 'verified'. "
+                    "Leave empty to call it for all the events.")
+    )
+
+    payload_fields = models.TextField(
+        blank=True,
+        default='',
+        validators=[validate_fields],
+        verbose_name=_("Payload fields"),
+        help_text=_("Dotted paths of the event data fields to send, separated by commas or new lines, e.g. "
+                    "user.pii.email, course_key. Leave empty to send all the data. "
+                    "The event metadata is always sent.")
+    )
+
     def __str__(self):
         """
         Get a string representation of this model instance.
@@ -174,8 +277,228 @@ class Webfilter(TimeStampedModel):
         help_text=_("When enabled, data will be sent in form format, instead of JSON")
     )
 
+    connect_timeout = models.FloatField(
+        default=10,
+        validators=[MinValueValidator(0.001)],
+        verbose_name=_("Connect timeout"),
+        help_text=_("Seconds to wait for the connection to the server to be established")
+    )
+
+    read_timeout = models.FloatField(
+        default=10,
+        validators=[MinValueValidator(0.001)],
+        verbose_name=_("Read timeout"),
+        help_text=_("Seconds to wait for the server to send a response")
+    )
+
+    request_compression = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+        choices=COMPRESSION_CHOICES,
+        verbose_name=_("Request compression"),
+        help_text=_("Compress the JSON data sent, if it is bigger than WEBHOOKS_COMPRESSION_MIN_SIZE bytes. "
+                    "The server must support the chosen content encoding.")
+    )
+
+    condition = models.TextField(
+        blank=True,
+        default='',
+        validators=[validate_condition],
+        verbose_name=_("Condition"),
+        help_text=_("Only call the URL when the data matches this expression, e.g. "
+                    "course_key.org == 'edX'. Leave empty to call it for all the events.")
+    )
+
+    payload_fields = models.TextField(
+        blank=True,
+        default='',
+        validators=[validate_fields],
+        verbose_name=_("Payload fields"),
+        help_text=_("Dotted paths of the fields to send, separated by commas or new lines, e.g. "
+                    "user.email, course.display_name. Leave empty to send all the data.")
+    )
+
+    response_cache_ttl = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name=_("Response cache TTL"),
+        help_text=_("Seconds to reuse the successful responses of the URL for the same data, or less if the "
+                    "server sets a shorter Cache-Control max-age. Only for webfilters whose response depends "
+                    "only on the data sent. Set it to 0 to call the URL every time.")
+    )
+
+    memoize_in_request = models.BooleanField(
+        default=False,
+        verbose_name=_("Reuse responses within a request"),
+        help_text=_("Reuse the response of the URL for the next identical data sent during the same request, e.g. "
+                    "when the webfilter runs for each block of a page. Only for webfilters whose response depends "
+                    "only on the data sent.")
+    )
+
+    batch_children = models.BooleanField(
+        default=False,
+        verbose_name=_("Batch children"),
+        help_text=_("Call the URL once for all the children of a vertical, with a JSON array of their data, instead "
+                    "of once for each child. The response must be a JSON array with the response of each child, in "
+                    "the same order. Only for VerticalBlockChildRenderStarted webfilters.")
+    )
+
+    include_completion_summary = models.BooleanField(
+        default=True,
+        verbose_name=_("Include completion summary"),
+        help_text=_("Add the completion summary of the user in the course to the data. It is only computed when "
+                    "at least one webfilter of the event includes it. Only for CertificateCreationRequested and "
+                    "CertificateRenderStarted webfilters.")
+    )
+
     def __str__(self):
         """
         Get a string representation of this model instance.
         """
         return f'Webhook filter for {self.event} to {self.webhook_url}'
+
+
+class WebhookDelivery(TimeStampedModel):
+    """
+    Outbox record of a webhook call.
+
+    Deliveries are stored while processing the event and sent later by the dispatcher, which deletes the delivered
+    and failed ones after WEBHOOKS_DELIVERY_RETENTION seconds.
+
+    .. pii: The payload may contain data of the user related to the event (e.g. username, email and name).
+        It is deleted after WEBHOOKS_DELIVERY_RETENTION seconds once the delivery is done or failed.
+    .. pii_types: id, username, email_address, name
+    .. pii_retirement: retained
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_DELIVERED = 'delivered'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _("Pending")),
+        (STATUS_SENDING, _("Sending")),
+        (STATUS_DELIVERED, _("Delivered")),
+        (STATUS_FAILED, _("Failed")),
+    )
+
+    webhook = models.ForeignKey(
+        Webhook,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        help_text=_("Webhook to deliver the payload to"),
+    )
+
+    event = models.CharField(
+        max_length=50,
+        blank=False,
+        help_text=_("Event type"),
+    )
+
+    payload = models.TextField(
+        help_text=_("JSON encoded payload to send"),
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+        help_text=_("Delivery status"),
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text=_("Number of times the delivery was attempted"),
+    )
+
+    status_code = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text=_("Status code of the last response"),
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        help_text=_("Error of the last failed attempt"),
+    )
+
+    entity_key = models.CharField(
+        max_length=255,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text=_("Key of the block, library or course of coalesced events"),
+    )
+
+    coalesced_events = models.PositiveIntegerField(
+        default=1,
+        help_text=_("Number of events merged in this delivery"),
+    )
+
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text=_("Date and time of the next attempt of a failed delivery"),
+    )
+
+    delivered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_("Date and time of the successful delivery"),
+    )
+
+    class Meta:
+        """
+        Model options.
+        """
+
+        verbose_name_plural = "webhook deliveries"
+
+    def __str__(self):
+        """
+        Get a string representation of this model instance.
+        """
+        return f'Delivery of {self.event} to {self.webhook.webhook_url} ({self.status})'
+
+
+class WebhookLedgerEntry(TimeStampedModel):
+    """
+    Record of an event already processed for a webhook, to skip duplicate deliveries of the same event.
+
+    .. no_pii:
+    """
+
+    webhook = models.ForeignKey(
+        Webhook,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+        help_text=_("Webhook the event was processed for"),
+    )
+
+    event_id = models.UUIDField(
+        help_text=_("Id of the event, from its metadata"),
+    )
+
+    class Meta:
+        """
+        Model options.
+        """
+
+        verbose_name_plural = "webhook ledger entries"
+        constraints = [
+            models.UniqueConstraint(fields=['event_id', 'webhook'], name='openedx_webhooks_unique_event_webhook'),
+        ]
+        indexes = [
+            models.Index(fields=['created'], name='webhooks_ledger_created_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Get a string representation of this model instance.
+        """
+        return f'Event {self.event_id} processed for {self.webhook.webhook_url}'
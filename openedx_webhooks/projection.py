@@ -0,0 +1,80 @@
+"""
+Projection of event and filter data on the fields requested by a webhook or webfilter.
+
+The fields are given as dotted paths, e.g. ``user.pii.email`` or ``course.display_name``. They are compiled into a
+tree that is applied to the data before serializing it, so the parts of the data not requested are never walked nor
+encoded. Paths that don't exist in the data are left out of the result. When a path goes through a list, the rest of
+the path is applied to each of its items.
+"""
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+_SEPARATORS = re.compile(r"[\s,]+")
+_PATH = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_]*(\.[A-Za-z0-9][A-Za-z0-9_]*)*$")
+
+
+def _split(fields):
+    return [path for path in _SEPARATORS.split(fields or "") if path]
+
+
+def validate_fields(fields):
+    """
+    Check that fields is a list of dotted paths separated by commas or whitespace.
+
+    Private names (starting with "_") are not allowed, as they are never serialized.
+    """
+    invalid = [path for path in _split(fields) if not _PATH.match(path)]
+    if invalid:
+        raise ValidationError(_("Invalid field paths: %(paths)s"), params={"paths": ", ".join(invalid)})
+
+
+@lru_cache(maxsize=256)
+def compile_fields(fields):
+    """
+    Compile a list of dotted paths into a tree of nested dicts.
+
+    A None leaf selects the whole value. Returns None when no fields are given, meaning that all the data is sent.
+    The tree is shared by all the callers with the same fields, so it must not be modified.
+    """
+    tree = {}
+    for path in _split(fields):
+        node = tree
+        names = path.split(".")
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                # A shorter path already selects the whole value
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree or None
+
+
+def get_field(o, name):
+    """
+    Get a field of a mapping or an attribute of an object.
+    """
+    if isinstance(o, Mapping):
+        return o[name]
+    return getattr(o, name)
+
+
+def project(o, tree):
+    """
+    Get the parts of o selected by a compiled tree, without serializing them.
+    """
+    if isinstance(o, (list, tuple, set)):
+        return [project(item, tree) for item in o]
+
+    result = {}
+    for name, subtree in tree.items():
+        try:
+            value = get_field(o, name)
+        except (KeyError, AttributeError):
+            continue
+        result[name] = value if subtree is None else project(value, subtree)
+    return result
@@ -5,35 +5,97 @@ import logging
 
 from attrs import asdict
 
-from .models import Webhook
-from .utils import send, value_serializer
+from . import completion, ledger
+from .conditions import matches
+from .config import get_snapshot
+from .deferred import send_on_commit
+from .deliveries import enqueue, enqueue_coalesced
+from .projection import compile_fields, project
+from .serializers import serialize
+from .utils import Payload, get_setting, value_serializer
 
 logger = logging.getLogger(__name__)
 
+# Attributes of the event data identifying the entity of coalesced events, from the most to the least specific
+ENTITY_KEY_ATTRIBUTES = ("usage_key", "collection_key", "container_key", "object_id", "library_key", "course_key")
+
+
+def _get_entity_key(data):
+    """
+    Get the key of the block, library or course the event data is about, or an empty string.
+    """
+    for name in ENTITY_KEY_ATTRIBUTES:
+        value = getattr(data, name, None)
+        if value:
+            return str(value)
+    return ''
+
 
 def _process_event(event_name, data, **kwargs):
     """
     Process all events with user data.
     """
+    snapshot = get_snapshot()
+    if event_name not in snapshot.active_events:
+        # Most events have no webhooks configured, so leave before doing any work
+        return
+
     logger.debug(f"Processing event: {event_name}")
-    webhooks = Webhook.objects.filter(enabled=True, event=event_name)
+
+    # Leave out the webhooks whose condition doesn't match before serializing anything
+    webhooks = [webhook for webhook in snapshot.webhooks[event_name] if matches(webhook.condition, data)]
+
+    # Leave out the webhooks this event was already processed for, e.g. if the signal was sent again
+    event_id = getattr(kwargs.get("metadata"), "id", None)
+    if event_id is not None and get_setting("WEBHOOKS_DEDUPLICATE_EVENTS"):
+        webhooks = [webhook for webhook in webhooks if ledger.claim(event_id, webhook)]
+
+    if not webhooks:
+        return
 
     # Get the name of the data type
     data_type = str(type(data)).split("'")[1]
 
+    event_metadata = asdict(kwargs.get("metadata"))
+
+    def _build_payload(fields):
+        tree = compile_fields(fields)
+        if tree is None:
+            event_data = asdict(data, value_serializer=value_serializer)
+        else:
+            # Only the requested fields are serialized
+            event_data = serialize(project(data, tree))
+        payload = Payload({data_type: event_data, 'event_metadata': event_metadata})
+        logger.debug(payload.data)
+        return payload
+
+    # Each payload is serialized only once and shared by all the webhooks of the event requesting the same fields
+    payloads = {}
     for webhook in webhooks:
-        logger.info(f"{event_name} webhook triggered to {webhook.webhook_url}")
+        if webhook.payload_fields not in payloads:
+            payloads[webhook.payload_fields] = _build_payload(webhook.payload_fields)
+
+    # The dispatcher will call the URLs out of the request that triggered the event. Batched webhooks always go
+    # through the outbox, where the dispatcher groups their deliveries, and so do coalesced events.
+    use_outbox = get_setting("WEBHOOKS_USE_OUTBOX")
+    entity_key = _get_entity_key(data)
+    inline_webhooks = []
+    for webhook in webhooks:
+        if webhook.coalesce_window and entity_key:
+            logger.info(f"{event_name} webhook to {webhook.webhook_url} coalesced for {entity_key}")
+            enqueue_coalesced(webhook, event_name, payloads[webhook.payload_fields], entity_key)
+        elif use_outbox or webhook.batch_format:
+            logger.info(f"{event_name} webhook queued to {webhook.webhook_url}")
+            enqueue(webhook, event_name, payloads[webhook.payload_fields])
+        else:
+            inline_webhooks.append(webhook)
+
+    webhooks = inline_webhooks
+    if not webhooks:
+        return
 
-        payload = {
-            data_type: asdict(data, value_serializer=value_serializer),
-            'event_metadata': asdict(kwargs.get("metadata")),
-        }
-        logger.warning(payload)
-        send(
-            webhook.webhook_url,
-            payload,
-            www_form_urlencoded=webhook.use_www_form_encoding,
-        )
+    # Call the URLs once the transaction that triggered the event commits
+    send_on_commit([(event_name, webhook, payloads[webhook.payload_fields]) for webhook in webhooks])
 
 
 def session_login_completed_receiver(user, **kwargs):
@@ -154,6 +216,7 @@ def program_certificate_revoked_receiver(program_certificate, **kwargs):
 
 def persistent_grade_summary_changed_receiver(grade, **kwargs):
     """Handle PERSISTENT_GRADE_SUMMARY_CHANGED signal."""
+    completion.invalidate(grade.course.course_key, grade.user_id)
     _process_event("PERSISTENT_GRADE_SUMMARY_CHANGED", grade, **kwargs)
 
 
@@ -229,11 +292,13 @@ def ora_submission_created_receiver(submission, **kwargs):
 
 def course_passing_status_updated_receiver(course_passing_status, **kwargs):
     """Handle COURSE_PASSING_STATUS_UPDATED signal."""
+    completion.invalidate(course_passing_status.course.course_key, course_passing_status.user.id)
     _process_event("COURSE_PASSING_STATUS_UPDATED", course_passing_status, **kwargs)
 
 
 def ccx_course_passing_status_updated_receiver(course_passing_status, **kwargs):
     """Handle CCX_COURSE_PASSING_STATUS_UPDATED signal."""
+    completion.invalidate(course_passing_status.course.ccx_course_key, course_passing_status.user.id)
     _process_event("CCX_COURSE_PASSING_STATUS_UPDATED", course_passing_status, **kwargs)
 
 
@@ -0,0 +1,105 @@
+"""
+Memoization of webfilter responses for the lifetime of one HTTP request.
+
+Some filters run many times while rendering one page, e.g. `VerticalBlockChildRenderStarted` and
+`RenderXBlockStarted` once for each block of a unit. Inside a request scope, the response of a webfilter that
+memoizes in the request is reused for the next identical payloads of the same request, so each distinct call is
+made once per page. Webfilters whose response depends on more than the data sent, e.g. on a counter or the time,
+leave it disabled. Setting the payload fields of the webfilter to the fields it needs makes the payloads of
+different calls identical more often.
+
+`RequestScopeMiddleware`, added by the plugin settings, opens a scope for each request. Code running outside of a
+request, like management commands or tasks, can open one with `request_scope`.
+
+The configuration lookups don't need to be memoized: they are served from the in-process snapshot of `config`.
+"""
+import contextvars
+import logging
+from contextlib import contextmanager
+
+from .utils import StreamingPayload
+
+logger = logging.getLogger(__name__)
+
+_scope = contextvars.ContextVar("openedx_webhooks_request_scope", default=None)
+
+
+class RequestScope:
+    """
+    Webfilter responses of one request, by webfilter and payload.
+    """
+
+    def __init__(self):
+        """
+        Create an empty scope.
+        """
+        self.responses = {}
+        # Responses of the batched webfilter calls, by webfilter and batch, and then by item (see `batching`)
+        self.batches = {}
+
+    @staticmethod
+    def _get_key(webfilter, payload):
+        # Streamed payloads would have to be fetched entirely to be hashed
+        if not webfilter.memoize_in_request or isinstance(payload, StreamingPayload):
+            return None
+        return webfilter.pk, payload.digest
+
+    def get(self, webfilter, payload):
+        """
+        Get the response of the webfilter to the same payload in this request, or None.
+        """
+        key = self._get_key(webfilter, payload)
+        response = self.responses.get(key) if key else None
+        if response is not None:
+            logger.debug(f"Reusing the response of {webfilter.webhook_url} in this request")
+        return response
+
+    def store(self, webfilter, payload, response):
+        """
+        Remember the response of the webfilter to the payload until the end of the request.
+        """
+        key = self._get_key(webfilter, payload)
+        if key:
+            self.responses[key] = response
+
+
+def get_scope():
+    """
+    Get the current request scope, or None outside of a scope.
+    """
+    return _scope.get()
+
+
+@contextmanager
+def request_scope():
+    """
+    Memoize the webfilter responses inside the block. Nested scopes share the outermost one.
+    """
+    if _scope.get() is not None:
+        yield _scope.get()
+        return
+
+    token = _scope.set(RequestScope())
+    try:
+        yield _scope.get()
+    finally:
+        _scope.reset(token)
+
+
+class RequestScopeMiddleware:
+    """
+    Open a request scope for each request.
+    """
+
+    def __init__(self, get_response):
+        """
+        Wrap the next middleware or view.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        Handle the request inside a new scope.
+        """
+        with request_scope():
+            return self.get_response(request)
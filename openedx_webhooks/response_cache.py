@@ -0,0 +1,148 @@
+"""
+Cache of the responses of webfilters whose answer depends only on the data sent.
+
+Webfilters like the ones rewriting URLs are called each time a link is generated, often many times per page with
+the same data. When a webfilter has a response cache TTL, its successful responses are kept for that many seconds,
+keyed by the webfilter and a hash of the data sent, and reused instead of calling the URL again. The server can
+shorten the TTL with the ``max-age`` or ``s-maxage`` directives of the Cache-Control header, or prevent caching with
+``no-store``, ``no-cache`` or ``private``.
+
+Responses are cached in each process, in a LRU of WEBHOOKS_RESPONSE_CACHE_SIZE entries, and when
+WEBHOOKS_RESPONSE_CACHE_ALIAS names a Django cache, also in that cache, shared by all the processes. Changing a
+webfilter discards its cached responses.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from .utils import StreamingPayload, get_setting
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "openedx_webhooks.response"
+
+# Cached responses by key, least recently used first, with the time they expire
+_responses = OrderedDict()
+_responses_lock = threading.Lock()
+
+
+class CachedResponse:
+    """
+    Response of a webfilter call reused from the cache.
+    """
+
+    def __init__(self, status_code, reason, text):
+        """
+        Create a response with the status code, reason and text of the cached one.
+        """
+        self.status_code = status_code
+        self.reason = reason
+        self.text = text
+
+    @property
+    def ok(self):
+        """
+        Check if the status code is not an error, like `requests.Response.ok`.
+        """
+        return self.status_code < 400
+
+
+def _get_key(webfilter, payload):
+    # The modification time discards the responses cached before the webfilter was changed
+    return f"{CACHE_KEY_PREFIX}.{webfilter.pk}.{webfilter.modified.timestamp()}.{payload.digest}"
+
+
+def _get_ttl(webfilter, response):
+    """
+    Get the seconds to cache a response, limited by its Cache-Control header.
+    """
+    directives = {}
+    for directive in response.headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        directives[name.lower()] = value.strip('"')
+
+    if directives.keys() & {'no-store', 'no-cache', 'private'}:
+        return 0
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return min(webfilter.response_cache_ttl, int(directives[name]))
+            except ValueError:
+                return 0
+    return webfilter.response_cache_ttl
+
+
+def _shared_cache():
+    alias = get_setting("WEBHOOKS_RESPONSE_CACHE_ALIAS")
+    return caches[alias] if alias else None
+
+
+def _is_cacheable(webfilter, payload):
+    # Streamed payloads would have to be fetched entirely to be hashed
+    return webfilter.response_cache_ttl > 0 and not isinstance(payload, StreamingPayload)
+
+
+def _remember(key, entry):
+    with _responses_lock:
+        _responses[key] = entry
+        _responses.move_to_end(key)
+        while len(_responses) > get_setting("WEBHOOKS_RESPONSE_CACHE_SIZE"):
+            _responses.popitem(last=False)
+
+
+def get(webfilter, payload):
+    """
+    Get the cached response of the webfilter to the payload, or None if there is none.
+    """
+    if not _is_cacheable(webfilter, payload):
+        return None
+
+    key = _get_key(webfilter, payload)
+    now = time.time()
+    with _responses_lock:
+        entry = _responses.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _responses.move_to_end(key)
+                logger.debug(f"Reusing the cached response of {webfilter.webhook_url}")
+                return CachedResponse(*entry[1:])
+            del _responses[key]
+
+    shared_cache = _shared_cache()
+    entry = shared_cache.get(key) if shared_cache is not None else None
+    if entry is None or entry[0] <= now:
+        return None
+
+    _remember(key, entry)
+    logger.debug(f"Reusing the shared cached response of {webfilter.webhook_url}")
+    return CachedResponse(*entry[1:])
+
+
+def store(webfilter, payload, response):
+    """
+    Cache the response of the webfilter to the payload, if it was successful and the server allows it.
+    """
+    if not _is_cacheable(webfilter, payload) or not 200 <= response.status_code <= 299:
+        return
+
+    ttl = _get_ttl(webfilter, response)
+    if ttl <= 0:
+        return
+
+    key = _get_key(webfilter, payload)
+    entry = (time.time() + ttl, response.status_code, response.reason, response.text)
+    _remember(key, entry)
+    shared_cache = _shared_cache()
+    if shared_cache is not None:
+        shared_cache.set(key, entry, timeout=ttl)
+
+
+def clear():
+    """
+    Forget the responses cached by this process.
+    """
+    with _responses_lock:
+        _responses.clear()
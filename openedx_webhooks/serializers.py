@@ -0,0 +1,164 @@
+"""
+Serialization of arbitrary objects into JSON-serializable values.
+
+Working out how to serialize an object takes a chain of type checks. That is done once per class, and the result is
+cached as a plan: a function that converts any instance of the class. Later objects are serialized by looking up the
+plan of their type, so large structures like XBlocks or render contexts don't go through the type checks again at
+every level.
+
+Within one serialization, objects are tracked by identity: an object reached again while it is being serialized (a
+cycle, e.g. between a block and its runtime) is replaced by a reference marker, and an object shared by several parts
+of the structure is serialized once and its result reused.
+"""
+import attr
+from opaque_keys import OpaqueKey
+from xblock.fields import ScopeIds
+
+MAX_DEPTH = 15
+DEPTH_LIMIT_REACHED = "! Depth limit reached !"
+CIRCULAR_REFERENCE = "! Circular reference !"
+
+# Serialization plan of each class
+_plans = {}
+
+
+def scope_ids_serializer(o):
+    """
+    Serialize instances of ScopeId.
+    """
+    return {
+        "block_type": o.block_type,
+        "def_id": str(o.def_id),
+        "usage_id": str(o.usage_id),
+        "user_id": o.user_id,
+    }
+
+
+class _Memo:
+    """
+    Objects seen during one serialization.
+    """
+
+    __slots__ = ("path", "done")
+
+    def __init__(self):
+        # Ids of the objects being serialized, from the root to the current one
+        self.path = set()
+        # Id -> (object, depth, result) of the objects already serialized. The object is kept so its id isn't reused
+        self.done = {}
+
+
+def _serialize_items(items, depth, memo):
+    """
+    Serialize the public items of a mapping. Private keys (starting with "_") and non string keys are skipped.
+    """
+    return {
+        key: serialize(value, depth + 1, memo)
+        for key, value in items
+        if isinstance(key, str) and not key.startswith("_")
+    }
+
+
+def _scalar_plan(o, depth, memo):  # pylint: disable=unused-argument
+    return o
+
+
+def _str_plan(o, depth, memo):  # pylint: disable=unused-argument
+    return str(o)
+
+
+def _scope_ids_plan(o, depth, memo):  # pylint: disable=unused-argument
+    return scope_ids_serializer(o)
+
+
+def _sequence_plan(o, depth, memo):
+    return [serialize(item, depth + 1, memo) for item in o]
+
+
+def _dict_plan(o, depth, memo):
+    return _serialize_items(o.copy().items(), depth, memo)
+
+
+def _object_plan(o, depth, memo):
+    # The attributes of these objects may differ between instances, so they are read each time
+    return _serialize_items(o.__dict__.copy().items(), depth, memo)
+
+
+def _attrs_plan(cls):
+    """
+    Build the plan of an attrs class, whose public fields are known in advance.
+    """
+    names = tuple(field.name for field in attr.fields(cls) if not field.name.startswith("_"))
+
+    def _plan(o, depth, memo):
+        return {name: serialize(getattr(o, name), depth + 1, memo) for name in names}
+
+    return _plan
+
+
+def _compile(o):
+    """
+    Work out the plan to serialize the objects of the same class as o.
+
+    Returns the plan and whether its result is a leaf value, which doesn't need to be tracked for cycles and reuse.
+    """
+    cls = type(o)
+    if o is None or issubclass(cls, (int, float, str)):
+        return _scalar_plan, True
+    # ScopeIds is a class present in block structures
+    if issubclass(cls, ScopeIds):
+        return _scope_ids_plan, True
+    if issubclass(cls, OpaqueKey):
+        return _str_plan, True
+    if issubclass(cls, (list, tuple, set)):
+        return _sequence_plan, False
+    if issubclass(cls, dict):
+        return _dict_plan, False
+    if attr.has(cls):
+        return _attrs_plan(cls), False
+    if hasattr(o, "__dict__"):
+        return _object_plan, False
+    # If it is not a dict and cannot be converted to a dict, stringify it
+    return _str_plan, True
+
+
+def get_plan(o):
+    """
+    Get the plan to serialize o and whether it is a leaf, compiling it the first time an object of its class is seen.
+    """
+    plan = _plans.get(type(o))
+    if plan is None:
+        plan = _plans[type(o)] = _compile(o)
+    return plan
+
+
+def serialize(o, depth=0, memo=None):
+    """
+    Serialize an arbitrary object as a json-serializable value.
+
+    The result of an object reached several times is shared, so it must not be modified in place. A result computed
+    deeper in the structure may have been cut by the depth limit, so it is only reused at the same depth or deeper.
+    """
+    if depth > MAX_DEPTH:
+        return DEPTH_LIMIT_REACHED
+
+    plan, leaf = get_plan(o)
+    if leaf:
+        return plan(o, depth, memo)
+
+    if memo is None:
+        memo = _Memo()
+    key = id(o)
+    if key in memo.path:
+        return CIRCULAR_REFERENCE
+    done = memo.done.get(key)
+    if done is not None and done[1] <= depth:
+        return done[2]
+
+    memo.path.add(key)
+    try:
+        result = plan(o, depth, memo)
+    finally:
+        memo.path.discard(key)
+    memo.done[key] = (o, depth, result)
+    return result
@@ -2,11 +2,16 @@
 CMS Pluggable Django App settings.
 """
 
+from .common import add_middleware, apply_default_settings
+
 
 def plugin_settings(settings):
     """
     Declare CMS-safe filters and their handlers.
     """
+    apply_default_settings(settings)
+    add_middleware(settings)
+
     filters_config = {
         "org.openedx.content_authoring.lms.page.url.requested.v1": {
             "fail_silently": False,
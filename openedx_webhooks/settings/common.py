@@ -3,12 +3,106 @@
 Common Pluggable Django App settings.
 
 """
+from django.conf import settings as django_settings
+
+# Default values of the settings used by this plugin. Any of them can be overridden in the LMS or CMS settings.
+WEBHOOKS_DEFAULT_SETTINGS = {
+    # Store webhook deliveries in the outbox table instead of calling the URLs while processing the event.
+    # Pending deliveries are sent by the `dispatch_webhooks` management command.
+    "WEBHOOKS_USE_OUTBOX": False,
+    # Maximum number of outbox deliveries claimed by the dispatcher at once.
+    "WEBHOOKS_DISPATCH_BATCH_SIZE": 100,
+    # Seconds after which a delivery claimed by a dispatcher that didn't finish it can be claimed again.
+    "WEBHOOKS_DISPATCH_CLAIM_TIMEOUT": 300,
+    # Maximum number of attempts of a webhook delivery, including the first one.
+    "WEBHOOKS_MAX_ATTEMPTS": 8,
+    # Seconds of the retry backoff after the first failed attempt. It doubles after each failed attempt.
+    "WEBHOOKS_RETRY_BASE_DELAY": 10,
+    # Maximum seconds of the retry backoff.
+    "WEBHOOKS_RETRY_MAX_DELAY": 3600,
+    # Seconds the delivered and failed deliveries are kept in the outbox. Older ones are deleted by the dispatcher.
+    "WEBHOOKS_DELIVERY_RETENTION": 30 * 24 * 3600,
+    # Maximum number of keep-alive connections kept open to each webhook host.
+    "WEBHOOKS_HTTP_POOL_MAXSIZE": 10,
+    # Seconds a pooled HTTP session can stay unused before it is closed and replaced by a new one.
+    "WEBHOOKS_HTTP_SESSION_IDLE_TIMEOUT": 60,
+    # Seconds between checks for changes in the webhooks and webfilters configuration made by other processes.
+    "WEBHOOKS_CONFIG_REFRESH_INTERVAL": 5,
+    # Maximum number of webhook requests in flight at the same time in each process.
+    "WEBHOOKS_MAX_CONCURRENT_REQUESTS": 16,
+    # Maximum number of webhook requests in flight at the same time to the same host, in each process.
+    "WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST": 4,
+    # Call the webhooks of the events sent inside a database transaction after it commits, and not at all if it
+    # rolls back. The webhooks of all the events of a transaction are called together.
+    "WEBHOOKS_SEND_ON_COMMIT": True,
+    # Call all the webfilters of an event at the same time instead of one after the other.
+    "WEBHOOKS_CONCURRENT_WEBFILTERS": False,
+    # Maximum seconds spent calling all the webfilters of an event. It can be a number for all the events, or a
+    # dict with the seconds for each event name. The webfilters not called in time are handled as if they had
+    # raised a request exception.
+    "WEBHOOKS_WEBFILTER_PIPELINE_TIMEOUT": None,
+    # Consecutive failures of a URL after which it is not called for a while. Set it to 0 to disable the breaker.
+    "WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD": 5,
+    # Seconds a URL is not called after reaching the failures threshold, before a single call is tried again.
+    "WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT": 30,
+    # JSON encoder of the payloads: "auto" (orjson if installed, else json), "orjson", "json", or the dotted path of
+    # a function that takes the payload data and returns JSON bytes.
+    "WEBHOOKS_JSON_ENCODER": "auto",
+    # Compression level of the request bodies of webhooks and webfilters with request compression, from 1 to 9.
+    "WEBHOOKS_COMPRESSION_LEVEL": 6,
+    # Minimum size in bytes of the JSON request bodies to compress. Smaller ones are sent uncompressed.
+    "WEBHOOKS_COMPRESSION_MIN_SIZE": 1024,
+    # Number of rows fetched, encoded and sent at a time when streaming QuerySets to webfilters.
+    "WEBHOOKS_STREAM_CHUNK_SIZE": 2000,
+    # Number of webfilter responses cached in each process, for the webfilters with a response cache TTL.
+    "WEBHOOKS_RESPONSE_CACHE_SIZE": 1000,
+    # Name of a Django cache where the webfilter responses are also cached, to share them among processes.
+    "WEBHOOKS_RESPONSE_CACHE_ALIAS": None,
+    # Seconds the completion summaries sent to the certificate webfilters are cached. They are also discarded when
+    # the grade of the user in the course changes. Set it to 0 to compute them every time.
+    "WEBHOOKS_COMPLETION_SUMMARY_TTL": 3600,
+    # Record the id of each event processed for each webhook, and skip the events already processed, e.g. when a
+    # signal is sent again.
+    "WEBHOOKS_DEDUPLICATE_EVENTS": False,
+    # Number of recently processed (event, webhook) pairs remembered in each process, to skip duplicates without
+    # querying the database.
+    "WEBHOOKS_LEDGER_CACHE_SIZE": 10000,
+    # Seconds the processed events are kept in the ledger. Older entries are deleted by the dispatcher.
+    "WEBHOOKS_LEDGER_RETENTION": 7 * 24 * 3600,
+}
+
+
+def get_setting(name):
+    """
+    Get a plugin setting, falling back to its default value when it is not defined in the Django settings.
+    """
+    return getattr(django_settings, name, WEBHOOKS_DEFAULT_SETTINGS[name])
+
+
+def apply_default_settings(settings):
+    """
+    Set the plugin settings that are not already defined.
+    """
+    for name, value in WEBHOOKS_DEFAULT_SETTINGS.items():
+        if not hasattr(settings, name):
+            setattr(settings, name, value)
+
+
+def add_middleware(settings):
+    """
+    Add the middleware that memoizes the webfilter responses during each request.
+    """
+    middleware = "openedx_webhooks.request_cache.RequestScopeMiddleware"
+    if hasattr(settings, 'MIDDLEWARE') and middleware not in settings.MIDDLEWARE:
+        settings.MIDDLEWARE = list(settings.MIDDLEWARE) + [middleware]
 
 
 def plugin_settings(settings):
     """
     Declare all filters and their handlers.
     """
+    apply_default_settings(settings)
+    add_middleware(settings)
 
     filters_config = {
         "org.openedx.learning.student.login.requested.v1": {
@@ -1,31 +1,288 @@
 """
 Utilities used by Open edX Events Receivers.
 """
+import gzip
+import hashlib
+import http.cookiejar
 import json
 import logging
+import threading
+import time
+import zlib
 from collections.abc import MutableMapping
 from typing import Any, Union
+from urllib.parse import urlsplit
 
 import requests
-from opaque_keys import OpaqueKey
-from xblock.fields import ScopeIds
+from requests.adapters import HTTPAdapter
+
+from . import circuit_breaker, encoders
+from .serializers import scope_ids_serializer, serialize  # pylint: disable=unused-import
+from .settings.common import get_setting
 
 logger = logging.getLogger(__name__)
 
+# Pooled HTTP sessions by destination (scheme and host), with the time they were last used
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# URLs that rejected a compressed request, which are sent uncompressed from then on
+_uncompressed_urls = set()
+
+
+def _new_session():
+    """
+    Create an HTTP session with a bounded pool of keep-alive connections.
+
+    Sessions are shared by all the calls to a host, on behalf of any user, so they don't keep the cookies received.
+    """
+    session = requests.Session()
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=get_setting("WEBHOOKS_HTTP_POOL_MAXSIZE"))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(url):
+    """
+    Get the pooled HTTP session used to call the host of the url.
+
+    Sessions keep the connections to each host alive between calls, saving the TCP and TLS handshakes.
+    Sessions unused for more than WEBHOOKS_HTTP_SESSION_IDLE_TIMEOUT seconds are closed, because the server
+    has most probably closed their connections already.
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    now = time.monotonic()
+    idle_timeout = get_setting("WEBHOOKS_HTTP_SESSION_IDLE_TIMEOUT")
+
+    with _sessions_lock:
+        for host, (session, last_used) in list(_sessions.items()):
+            if now - last_used > idle_timeout:
+                logger.debug(f"Closing idle HTTP session to {host[1]}")
+                session.close()
+                del _sessions[host]
+
+        session = _sessions[key][0] if key in _sessions else _new_session()
+        _sessions[key] = (session, now)
+
+    return session
+
+
+def close_sessions():
+    """
+    Close all pooled HTTP sessions.
+    """
+    with _sessions_lock:
+        for session, _ in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+class Payload:
+    """
+    Payload of a webhook call, shared by all the calls triggered by the same event.
+
+    The JSON, compressed and form encoded versions are computed the first time they are needed and then reused.
+    """
+
+    def __init__(self, data=None, encoded_json=None):
+        """
+        Create a payload from a dict, or from its JSON encoded version.
+        """
+        self._data = data
+        self._json = encoded_json
+        self._form = None
+        self._compressed = {}
+        self._digest = None
+
+    @classmethod
+    def from_json(cls, encoded_json):
+        """
+        Create a payload from its JSON encoded version, e.g. as stored in the outbox.
+        """
+        if isinstance(encoded_json, str):
+            encoded_json = encoded_json.encode('utf-8')
+        return cls(encoded_json=encoded_json)
+
+    @property
+    def data(self) -> dict:
+        """
+        Get the payload as a dict.
+        """
+        if self._data is None:
+            self._data = json.loads(self._json)
+        return self._data
+
+    @property
+    def json(self) -> bytes:
+        """
+        Get the payload encoded as JSON.
+        """
+        if self._json is None:
+            self._json = encoders.encode(self.data)
+        return self._json
 
-def send(url, payload, www_form_urlencoded: bool = False):
+    @property
+    def digest(self) -> str:
+        """
+        Get a hash of the payload data, except the event metadata, which changes on every call.
+
+        The event metadata is the last key of the payloads, so the hash is taken from the JSON that comes before it,
+        without encoding the data again.
+        """
+        if self._digest is None:
+            encoded = self.json
+            if next(reversed(self.data), None) == 'event_metadata':
+                end = encoded.rfind(b'"event_metadata"')
+                if end >= 0:
+                    encoded = encoded[:end]
+            self._digest = hashlib.sha256(encoded).hexdigest()
+        return self._digest
+
+    def compressed(self, encoding) -> bytes:
+        """
+        Get the JSON payload compressed with the content encoding "gzip" or "deflate".
+        """
+        if encoding not in self._compressed:
+            level = get_setting("WEBHOOKS_COMPRESSION_LEVEL")
+            if encoding == "gzip":
+                # Without the modification time, the same payload always gives the same bytes
+                self._compressed[encoding] = gzip.compress(self.json, compresslevel=level, mtime=0)
+            elif encoding == "deflate":
+                self._compressed[encoding] = zlib.compress(self.json, level)
+            else:
+                raise ValueError(f"Unsupported content encoding: {encoding}")
+        return self._compressed[encoding]
+
+    @property
+    def form(self) -> dict:
+        """
+        Get the payload flattened for WWW form encoding.
+        """
+        if self._form is None:
+            self._form = flatten_dict(self.data)
+        return self._form
+
+
+class StreamingPayload(Payload):
+    """
+    Payload with the rows of a QuerySet, streamed in chunks instead of encoded all at once.
+
+    The body is the JSON of the other data with the list of rows added under `key`. The rows are fetched
+    WEBHOOKS_STREAM_CHUNK_SIZE at a time, and each chunk is encoded and sent before fetching the next one, so the
+    memory used doesn't grow with the number of rows. Each call to `chunks` runs the query again.
+    """
+
+    def __init__(self, data, key, rows):
+        """
+        Create a streaming payload from a dict and the QuerySet of the rows to add to it, e.g. from `values()`.
+        """
+        super().__init__()
+        self._head = data
+        self.key = key
+        self.rows = rows
+
+    @property
+    def data(self) -> dict:
+        """
+        Get the payload as a dict, with all the rows in memory.
+        """
+        if self._data is None:
+            self._data = {**self._head, self.key: list(self.rows)}
+        return self._data
+
+    def chunks(self):
+        """
+        Generate the JSON payload in chunks of rows.
+        """
+        head = encoders.encode(self._head)
+        yield head[:-1] + (b"," if len(head) > 2 else b"") + encoders.encode(self.key) + b":["
+
+        chunk_size = get_setting("WEBHOOKS_STREAM_CHUNK_SIZE")
+        separator = b""
+        chunk = []
+        for row in self.rows.iterator(chunk_size=chunk_size):
+            chunk.append(encoders.encode(row))
+            if len(chunk) >= chunk_size:
+                yield separator + b",".join(chunk)
+                separator = b","
+                chunk = []
+        if chunk:
+            yield separator + b",".join(chunk)
+
+        yield b"]}"
+
+    def compressed_chunks(self, encoding):
+        """
+        Generate the JSON payload in chunks compressed with the content encoding "gzip" or "deflate".
+        """
+        if encoding not in ("gzip", "deflate"):
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+        level = get_setting("WEBHOOKS_COMPRESSION_LEVEL")
+        # 31 window bits write a gzip header and trailer, without modification time
+        compressor = zlib.compressobj(level, wbits=31 if encoding == "gzip" else 15)
+        for chunk in self.chunks():
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+
+def send(url, payload, www_form_urlencoded: bool = False, timeout=10, compression=None,
+         content_type='application/json'):
     """
     Dispatch the payload to the webhook url, return the response and catch exceptions.
+
+    The payload can be a dict or a `Payload`, which is encoded only once when sent to many urls.
+    The timeout can be a number of seconds or a (connect timeout, read timeout) tuple.
+    JSON payloads of at least WEBHOOKS_COMPRESSION_MIN_SIZE bytes are compressed with the `compression` content
+    encoding ("gzip" or "deflate"). If the url rejects them with a 415 response, the payload is sent again
+    uncompressed, and so are the next ones to that url. `content_type` can be set for JSON based formats.
+    A `StreamingPayload` is sent with chunked transfer encoding, and compressed regardless of its size.
+    Raises `CircuitOpenError` without calling the url if it has been failing.
     """
+    if not circuit_breaker.allow_request(url):
+        raise circuit_breaker.CircuitOpenError(f"Circuit open for {url}: not sending the request.")
+
+    if not isinstance(payload, Payload):
+        payload = Payload(payload)
+
     if www_form_urlencoded:
         headers = {'Content-type': 'application/x-www-form-urlencoded', 'Accept': 'text/plain'}
-        payload = flatten_dict(payload)
-        data = payload
+        data = payload.form
     else:
-        headers = {'Content-type': 'application/json', 'Accept': 'text/plain'}
-        data = json.dumps(payload, default=str)
+        headers = {'Content-type': content_type, 'Accept': 'text/plain'}
+        if isinstance(payload, StreamingPayload):
+            # The size is not known before fetching all the rows
+            data = payload.chunks()
+            if compression and url not in _uncompressed_urls:
+                headers['Content-Encoding'] = compression
+                data = payload.compressed_chunks(compression)
+        else:
+            data = payload.json
+            if compression and url not in _uncompressed_urls and \
+                    len(data) >= get_setting("WEBHOOKS_COMPRESSION_MIN_SIZE"):
+                headers['Content-Encoding'] = compression
+                data = payload.compressed(compression)
+
+    try:
+        r = get_session(url).post(url, data=data, headers=headers, timeout=timeout)
+        if r.status_code == 415 and 'Content-Encoding' in headers:
+            logger.warning(f"{url} doesn't accept {compression} compressed requests. Sending them uncompressed.")
+            _uncompressed_urls.add(url)
+            del headers['Content-Encoding']
+            data = payload.chunks() if isinstance(payload, StreamingPayload) else payload.json
+            r = get_session(url).post(url, data=data, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException:
+        circuit_breaker.record_failure(url)
+        raise
 
-    r = requests.post(url, data=data, headers=headers, timeout=10)
+    if r.status_code >= 500:
+        circuit_breaker.record_failure(url)
+    else:
+        circuit_breaker.record_success(url)
 
     return r
 
@@ -54,48 +311,10 @@ def value_serializer(inst, field, value):  # pylint: disable=unused-argument
     return object_serializer(value)
 
 
-def scope_ids_serializer(o):
-    """
-    Serialize instances of ScopeId.
-    """
-    return {
-        "block_type": o.block_type,
-        "def_id": str(o.def_id),
-        "usage_id": str(o.usage_id),
-        "user_id": o.user_id,
-    }
-
-
 def object_serializer(o, depth=0) -> Union[dict, Any]:
     """
     Serialize an arbitrary object as a json-serializable dict.
+
+    See `serializers.serialize`, which caches how to serialize each class.
     """
-    if depth > 15:
-        return "! Depth limit reached !"
-    # First serialize scalar objects
-    if isinstance(o, (int, float,  str)) or o is None:
-        return o
-    # ScopeIds is a class present in block structures
-    elif isinstance(o, ScopeIds):
-        return scope_ids_serializer(o)
-    elif isinstance(o, OpaqueKey):
-        return str(o)
-    if isinstance(o, (list, tuple, set)):
-        return [object_serializer(item, depth + 1) for item in o]
-    # Now serialize dict-like objects
-    return_value = {}
-    if isinstance(o, dict):
-        dict_values = o.copy()
-    elif hasattr(o, "__dict__"):
-        dict_values = o.__dict__.copy()
-    # if it is not a dict and cannot be converted to a dict, try to stringify it.
-    elif hasattr(o, "__str__"):
-        return str(o)
-    else:
-        return f"Unserializable {type(o)}"
-    for key, value in dict_values.items():
-        if isinstance(key, str):
-            # Hide the private fields
-            if not key.startswith("_"):
-                return_value[key] = object_serializer(value, depth + 1)
-    return return_value
+    return serialize(o, depth)
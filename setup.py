@@ -122,6 +122,10 @@ setup(
 
     include_package_data=True,
     install_requires=load_requirements('requirements/base.in'),
+    extras_require={
+        # Faster JSON encoding of the payloads
+        'orjson': ['orjson'],
+    },
     python_requires=">=3.11",
     license="AGPL 3.0",
     zip_safe=False,
@@ -0,0 +1,86 @@
+"""
+Tests for the `openedx_webhooks.batching` module.
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from openedx_webhooks import batching
+from openedx_webhooks.request_cache import request_scope
+from openedx_webhooks.utils import Payload
+
+WEBFILTER = SimpleNamespace(pk=1, event="VerticalBlockChildRenderStarted", webhook_url="https://example.com/filter",
+                            payload_fields="", request_compression="")
+
+ITEMS = [("child-1", {"block": "one"}), ("child-2", {"block": "two"})]
+
+
+def _build_payload(fields, data):  # pylint: disable=unused-argument
+    return Payload({**data, "event_metadata": {"event_type": WEBFILTER.event}})
+
+
+def _batch(item_id, listed=None):
+    def get_items():
+        if listed is not None:
+            listed.append(item_id)
+        return ITEMS
+    return "vertical", item_id, get_items
+
+
+def test_children_of_a_batch_share_one_call(monkeypatch):
+    """The first child calls the URL for all the children, and each one gets its own response."""
+    posted = []
+    listed = []
+
+    def fake_send(url, payload, **kwargs):
+        posted.append(json.loads(payload.json))
+        return SimpleNamespace(status_code=200, reason="OK", text=json.dumps([
+            {"data": {"context": {"n": 1}}},
+            {"exception": {"PreventChildBlockRender": "hidden"}},
+        ]))
+
+    monkeypatch.setattr(batching, "send", fake_send)
+
+    with request_scope() as scope:
+        first = batching.get_response(scope, WEBFILTER, _batch("child-1", listed), _build_payload, 5)
+        second = batching.get_response(scope, WEBFILTER, _batch("child-2", listed), _build_payload, 5)
+        unknown = batching.get_response(scope, WEBFILTER, _batch("child-3", listed), _build_payload, 5)
+
+    assert [[item["block"] for item in body] for body in posted] == [["one", "two"]]
+    # The items are only listed for the call
+    assert listed == ["child-1"]
+    assert json.loads(first.text) == {"data": {"context": {"n": 1}}}
+    assert json.loads(second.text) == {"exception": {"PreventChildBlockRender": "hidden"}}
+    assert unknown is None
+
+
+@pytest.mark.parametrize("status_code, text", [(500, "error"), (200, "not json"), (200, "[{}]")])
+def test_failed_batches_are_the_response_of_every_child(status_code, text):
+    """Error responses are kept as they are, and invalid responses give an empty response to every child."""
+    response = SimpleNamespace(status_code=status_code, reason="Reason", text=text)
+
+    responses = batching.split_response("https://example.com/filter", response, 2)
+
+    if status_code == 500:
+        assert responses == [response, response]
+    else:
+        assert [json.loads(r.text) for r in responses] == [{}, {}]
+
+
+def test_request_exceptions_are_raised_for_every_child(monkeypatch):
+    calls = []
+
+    def fake_send(url, payload, **kwargs):
+        calls.append(url)
+        raise requests.exceptions.ConnectionError("down")
+
+    monkeypatch.setattr(batching, "send", fake_send)
+
+    with request_scope() as scope:
+        for child in ("child-1", "child-2"):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                batching.get_response(scope, WEBFILTER, _batch(child), _build_payload, 5)
+
+    assert len(calls) == 1
@@ -0,0 +1,89 @@
+"""
+Tests for the `openedx_webhooks.circuit_breaker` module.
+"""
+from types import SimpleNamespace
+
+import pytest
+import requests
+from django.core.cache import cache
+
+from openedx_webhooks import circuit_breaker
+from openedx_webhooks.utils import send
+
+URL = "https://example.com/webhook"
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(settings):
+    settings.WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD = 3
+    settings.WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT = 30
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "time", lambda: now[0])
+    return now
+
+
+def test_circuit_opens_after_consecutive_failures(clock):  # pylint: disable=unused-argument
+    """The circuit opens when the failures threshold is reached."""
+    for _ in range(2):
+        circuit_breaker.record_failure(URL)
+    assert circuit_breaker.allow_request(URL)
+
+    circuit_breaker.record_failure(URL)
+    assert not circuit_breaker.allow_request(URL)
+    assert circuit_breaker.allow_request("https://other.example.com/webhook")
+
+
+def test_successes_reset_the_failures_count():
+    """Only consecutive failures open the circuit."""
+    circuit_breaker.record_failure(URL)
+    circuit_breaker.record_failure(URL)
+    circuit_breaker.record_success(URL)
+    circuit_breaker.record_failure(URL)
+
+    assert circuit_breaker.allow_request(URL)
+
+
+def test_half_open_circuit_lets_a_single_probe_through(clock):
+    """After the reset timeout one probe is sent. Its result closes or opens the circuit again."""
+    for _ in range(3):
+        circuit_breaker.record_failure(URL)
+
+    clock[0] += 31
+    assert circuit_breaker.allow_request(URL)
+    assert not circuit_breaker.allow_request(URL)
+
+    # The probe failed: the circuit opens again
+    circuit_breaker.record_failure(URL)
+    assert not circuit_breaker.allow_request(URL)
+
+    clock[0] += 31
+    assert circuit_breaker.allow_request(URL)
+    circuit_breaker.record_success(URL)
+    assert circuit_breaker.allow_request(URL)
+    assert circuit_breaker.allow_request(URL)
+
+
+def test_send_fails_fast_while_the_circuit_is_open(monkeypatch):
+    """send records failures and raises a RequestException without calling an open circuit."""
+    calls = []
+
+    def failing_post(url, **kwargs):
+        calls.append(url)
+        raise requests.exceptions.ConnectTimeout("timed out")
+
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", lambda url: SimpleNamespace(post=failing_post))
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            send(URL, {})
+
+    with pytest.raises(circuit_breaker.CircuitOpenError):
+        send(URL, {})
+    assert len(calls) == 3
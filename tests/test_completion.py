@@ -0,0 +1,84 @@
+"""
+Tests for the `openedx_webhooks.completion` module.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from opaque_keys.edx.keys import CourseKey
+from openedx_events.learning.data import CourseData, PersistentCourseGradeData
+
+from openedx_webhooks import completion
+from openedx_webhooks.receivers import persistent_grade_summary_changed_receiver
+
+COURSE_KEY = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+USER = SimpleNamespace(id=7)
+
+
+@pytest.fixture(name="computed")
+def fixture_computed():
+    cache.clear()
+    computed = []
+
+    def compute(course_key, user):
+        computed.append((course_key, user.id))
+        return {"complete_count": len(computed), "incomplete_count": 0, "locked_count": 0}
+
+    yield computed, compute
+    cache.clear()
+
+
+def _grade(user_id):
+    return PersistentCourseGradeData(
+        user_id=user_id,
+        course=CourseData(course_key=COURSE_KEY),
+        course_edited_timestamp=datetime.now(timezone.utc),
+        course_version="1",
+        grading_policy_hash="hash",
+        percent_grade=0.5,
+        letter_grade="Pass",
+        passed_timestamp=datetime.now(timezone.utc),
+    )
+
+
+def test_summaries_are_computed_once(computed):
+    calls, compute = computed
+
+    first = completion.get_completion_summary(COURSE_KEY, USER, compute)
+    second = completion.get_completion_summary(COURSE_KEY, USER, compute)
+
+    assert first == second
+    assert calls == [(COURSE_KEY, 7)]
+
+
+def test_summaries_are_not_cached_without_ttl(computed, settings):
+    settings.WEBHOOKS_COMPLETION_SUMMARY_TTL = 0
+    calls, compute = computed
+
+    completion.get_completion_summary(COURSE_KEY, USER, compute)
+    completion.get_completion_summary(COURSE_KEY, USER, compute)
+
+    assert len(calls) == 2
+
+
+@pytest.mark.django_db
+def test_grade_changes_discard_the_summary(computed):
+    """The summary is computed again after the grade of the user in the course changes, even with no webfilter."""
+    calls, compute = computed
+    completion.get_completion_summary(COURSE_KEY, USER, compute)
+    completion.get_completion_summary(COURSE_KEY, SimpleNamespace(id=8), compute)
+
+    persistent_grade_summary_changed_receiver(_grade(7))
+
+    assert completion.get_completion_summary(COURSE_KEY, USER, compute)["complete_count"] == 3
+    assert completion.get_completion_summary(COURSE_KEY, SimpleNamespace(id=8), compute)["complete_count"] == 2
+
+
+@pytest.mark.django_db
+def test_grade_changes_leave_the_cache_alone_when_summaries_are_not_cached(computed, monkeypatch, settings):
+    """The cache isn't touched on each grade change when the summaries are not cached."""
+    settings.WEBHOOKS_COMPLETION_SUMMARY_TTL = 0
+    monkeypatch.setattr(cache, "delete", pytest.fail)
+
+    persistent_grade_summary_changed_receiver(_grade(7))
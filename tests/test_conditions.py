@@ -0,0 +1,90 @@
+"""
+Tests for the `openedx_webhooks.conditions` module.
+"""
+from types import SimpleNamespace
+
+import attr
+import pytest
+from django.core.exceptions import ValidationError
+from opaque_keys.edx.keys import CourseKey
+
+from openedx_webhooks import config
+from openedx_webhooks.conditions import ConditionError, compile_condition, matches, validate_condition
+from openedx_webhooks.models import Webhook
+from openedx_webhooks.receivers import _process_event
+
+
+@attr.s(frozen=True)
+class CourseData:
+    course_key = attr.ib(type=CourseKey)
+
+
+@attr.s(frozen=True)
+class EnrollmentData:
+    course = attr.ib(type=CourseData)
+    mode = attr.ib(type=str)
+
+
+@attr.s(frozen=True)
+class Metadata:
+    event_type = attr.ib(type=str)
+
+
+def _enrollment(course_id="course-v1:edX+DemoX+Demo_Course", mode="verified"):
+    return EnrollmentData(CourseData(CourseKey.from_string(course_id)), mode)
+
+
+@pytest.mark.parametrize("condition, expected", [
+    ("", True),
+    ("mode == 'verified'", True),
+    ("mode != 'verified'", False),
+    ("course.course_key.org in {'edX', 'OpenCraft'} and mode == 'verified'", True),
+    ("course.course_key.org not in ['edX'] or mode == 'audit'", False),
+    ("not mode == 'audit'", True),
+    ("course.course_key == 'course-v1:edX+DemoX+Demo_Course'", True),
+    ("course.missing is None", True),
+    ("course.missing > 3", False),
+])
+def test_matches(condition, expected):
+    """Conditions are evaluated on the raw data, with opaque keys compared as strings."""
+    assert matches(condition, _enrollment()) is expected
+
+
+def test_matches_mappings():
+    """Field paths also work on dicts, as sent to webfilters."""
+    assert matches("user.is_staff and context.view == 'student_view'", {
+        "user": SimpleNamespace(is_staff=True),
+        "context": {"view": "student_view"},
+    })
+
+
+@pytest.mark.parametrize("condition", [
+    "__import__('os').system('ls')",
+    "mode.upper() == 'VERIFIED'",
+    "course._state",
+    "mode == [m for m in 'ab']",
+    "mode ==",
+])
+def test_unsafe_or_invalid_conditions_are_rejected(condition):
+    """Only comparisons of fields and constants can be compiled, and invalid conditions never match."""
+    with pytest.raises(ConditionError):
+        compile_condition(condition)
+    with pytest.raises(ValidationError):
+        validate_condition(condition)
+    assert not matches(condition, _enrollment())
+
+
+@pytest.mark.django_db
+def test_non_matching_webhooks_are_skipped(monkeypatch):
+    """Webhooks whose condition doesn't match are not called, and their payload is not serialized."""
+    Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/edx",
+                           condition="course.course_key.org == 'edX'")
+    config.invalidate()
+    sent = []
+    monkeypatch.setattr("openedx_webhooks.deferred.send", lambda url, *args, **kwargs: sent.append(url))
+    monkeypatch.setattr("openedx_webhooks.receivers.asdict", pytest.fail)
+
+    _process_event("COURSE_ENROLLMENT_CREATED", _enrollment("course-v1:Other+DemoX+Demo_Course"),
+                   metadata=Metadata("enrollment"))
+
+    assert not sent
@@ -0,0 +1,75 @@
+"""
+Tests for the `openedx_webhooks.config` module.
+"""
+import pytest
+from django.core.cache import cache
+
+from openedx_webhooks import config
+from openedx_webhooks.models import Webfilter, Webhook
+from openedx_webhooks.receivers import _process_event
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshot():
+    config.invalidate()
+
+
+@pytest.mark.django_db
+def test_snapshot_indexes_enabled_configuration_by_event(django_assert_num_queries):
+    """Only enabled rows are returned, and later lookups don't query the database."""
+    webhook = Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/a")
+    Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/b", enabled=False)
+    webfilter = Webfilter.objects.create(event="StudentLoginRequested", webhook_url="https://example.com/c")
+
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == [webhook]
+
+    with django_assert_num_queries(0):
+        assert config.get_webfilters("StudentLoginRequested") == [webfilter]
+        assert config.get_webhooks("SESSION_LOGIN_COMPLETED") == []
+
+
+@pytest.mark.django_db
+def test_saving_configuration_invalidates_the_snapshot(django_capture_on_commit_callbacks):
+    """Changes in the admin are visible once the transaction is committed."""
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        webhook = Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/a")
+
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == [webhook]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        webhook.delete()
+
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == []
+
+
+@pytest.mark.django_db
+def test_changes_from_other_processes_are_seen_after_the_refresh_interval(settings, monkeypatch):
+    """The shared generation token is checked at most once per refresh interval."""
+    settings.WEBHOOKS_CONFIG_REFRESH_INTERVAL = 5
+    now = [1000.0]
+    monkeypatch.setattr(config.time, "monotonic", lambda: now[0])
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == []
+
+    # Simulate a change made in another process: the row is saved and the shared token changed
+    webhook = Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/a")
+    cache.set(config.GENERATION_CACHE_KEY, "changed-by-another-process")
+
+    now[0] += 1
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == []
+    now[0] += 5
+    assert config.get_webhooks("COURSE_ENROLLMENT_CREATED") == [webhook]
+
+
+@pytest.mark.django_db
+def test_events_without_webhooks_return_before_doing_any_work(django_assert_num_queries):
+    """Receivers of events without webhooks don't query the database nor serialize the data."""
+    Webhook.objects.create(event="COURSE_ENROLLMENT_CREATED", webhook_url="https://example.com/a")
+    config.get_snapshot()
+
+    with django_assert_num_queries(0):
+        # The data is not an attrs instance, so serializing it would fail
+        _process_event("SESSION_LOGIN_COMPLETED", object())
+
+    assert config.get_snapshot().active_events == {"COURSE_ENROLLMENT_CREATED"}
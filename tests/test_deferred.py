@@ -0,0 +1,62 @@
+"""
+Tests for the `openedx_webhooks.deferred` module.
+"""
+from types import SimpleNamespace
+
+import pytest
+from django.db import transaction
+
+from openedx_webhooks import deferred
+
+
+def _webhook(url):
+    return SimpleNamespace(webhook_url=url, use_www_form_encoding=False, connect_timeout=1, read_timeout=1,
+                           request_compression='')
+
+
+@pytest.fixture(name="sent")
+def fixture_sent(monkeypatch):
+    sent = []
+
+    def fake_send(url, payload, **kwargs):
+        sent.append((url, payload))
+        return SimpleNamespace(status_code=200, reason="OK", ok=True)
+
+    monkeypatch.setattr(deferred, "send", fake_send)
+    return sent
+
+
+@pytest.mark.django_db(transaction=True)
+def test_calls_are_sent_right_away_without_transaction(sent):
+    """Outside of a transaction there is nothing to wait for."""
+    deferred.send_on_commit([("EVENT", _webhook("https://example.com/a"), {"a": 1})])
+
+    assert sent == [("https://example.com/a", {"a": 1})]
+
+
+@pytest.mark.django_db
+def test_calls_of_a_transaction_are_sent_together_on_commit(sent, django_capture_on_commit_callbacks):
+    """The calls of all the events of a transaction are sent in a single flush after it commits."""
+    with django_capture_on_commit_callbacks() as callbacks:
+        deferred.send_on_commit([("EVENT", _webhook("https://example.com/a"), {"a": 1})])
+        deferred.send_on_commit([("EVENT", _webhook("https://example.com/b"), {"b": 1})])
+
+    assert not sent
+    assert len(callbacks) == 1
+
+    callbacks[0]()
+    assert sorted(url for url, _ in sent) == ["https://example.com/a", "https://example.com/b"]
+
+
+@pytest.mark.django_db
+def test_calls_of_a_rolled_back_savepoint_are_dropped(sent, django_capture_on_commit_callbacks):
+    """Events sent inside a savepoint that is rolled back are never delivered."""
+    with django_capture_on_commit_callbacks(execute=True):
+        deferred.send_on_commit([("EVENT", _webhook("https://example.com/a"), {"a": 1})])
+        with pytest.raises(ValueError):
+            with transaction.atomic():
+                deferred.send_on_commit([("EVENT", _webhook("https://example.com/phantom"), {})])
+                raise ValueError
+        deferred.send_on_commit([("EVENT", _webhook("https://example.com/b"), {"b": 1})])
+
+    assert sorted(url for url, _ in sent) == ["https://example.com/a", "https://example.com/b"]
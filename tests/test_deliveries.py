@@ -0,0 +1,319 @@
+"""
+Tests for the `openedx_webhooks.deliveries` module.
+"""
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+import attr
+import pytest
+import requests
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from openedx_webhooks import circuit_breaker, config, deliveries
+from openedx_webhooks.models import Webhook, WebhookDelivery
+from openedx_webhooks.receivers import _process_event
+
+
+@attr.s(frozen=True)
+class UserData:
+    """Event data stub."""
+
+    id = attr.ib(type=int)
+    is_active = attr.ib(type=bool)
+
+
+@attr.s(frozen=True)
+class Metadata:
+    """Event metadata stub."""
+
+    event_type = attr.ib(type=str)
+
+
+def _response(status_code=200):
+    return SimpleNamespace(status_code=status_code, reason="OK", ok=status_code < 400)
+
+
+@pytest.fixture(name="webhook")
+def fixture_webhook():
+    webhook = Webhook.objects.create(
+        event="SESSION_LOGIN_COMPLETED",
+        webhook_url="https://example.com/hook",
+        connect_timeout=2,
+        read_timeout=5,
+    )
+    config.invalidate()
+    return webhook
+
+
+@pytest.mark.django_db
+def test_outbox_stores_deliveries_without_calling_the_url(settings, monkeypatch, webhook):
+    """With the outbox enabled, processing an event only stores the delivery."""
+    settings.WEBHOOKS_USE_OUTBOX = True
+    monkeypatch.setattr("openedx_webhooks.deferred.send", pytest.fail)
+
+    _process_event("SESSION_LOGIN_COMPLETED", UserData(id=4, is_active=True), metadata=Metadata("login"))
+
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.webhook == webhook
+    assert delivery.status == WebhookDelivery.STATUS_PENDING
+    assert json.loads(delivery.payload)["event_metadata"] == {"event_type": "login"}
+
+
+@pytest.mark.django_db
+def test_dispatch_pending_sends_and_records_the_result(monkeypatch, webhook):
+    """The dispatcher sends pending deliveries and records their status."""
+    sent = []
+
+    def fake_send(url, payload, www_form_urlencoded=False, timeout=None, compression=None):
+        sent.append((url, payload.data, www_form_urlencoded, timeout))
+        return _response(200)
+
+    monkeypatch.setattr(deliveries, "send", fake_send)
+    deliveries.enqueue(webhook, webhook.event, {"user": {"id": 4}})
+
+    assert deliveries.dispatch_pending() == 1
+
+    delivery = WebhookDelivery.objects.get()
+    assert sent == [("https://example.com/hook", {"user": {"id": 4}}, False, (2, 5))]
+    assert delivery.status == WebhookDelivery.STATUS_DELIVERED
+    assert delivery.attempts == 1
+    assert delivery.status_code == 200
+    assert deliveries.dispatch_pending() == 0
+
+
+@pytest.mark.django_db
+def test_dispatch_schedules_retries_of_failed_deliveries(settings, monkeypatch, webhook):
+    """Request exceptions schedule a retry with backoff, until the maximum number of attempts."""
+    settings.WEBHOOKS_MAX_ATTEMPTS = 2
+
+    def failing_send(*args, **kwargs):
+        raise requests.exceptions.ConnectionError("refused")
+
+    monkeypatch.setattr(deliveries, "send", failing_send)
+    deliveries.enqueue(webhook, webhook.event, {})
+
+    call_command("dispatch_webhooks")
+
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.STATUS_PENDING
+    assert delivery.attempts == 1
+    assert delivery.last_error == "refused"
+    assert delivery.next_attempt_at > delivery.modified - timedelta(seconds=1)
+
+    # The retry is not sent before its time
+    assert deliveries.dispatch_pending() == 0
+
+    WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+    assert deliveries.dispatch_pending() == 1
+
+    delivery.refresh_from_db()
+    assert delivery.status == WebhookDelivery.STATUS_FAILED
+    assert delivery.attempts == 2
+
+
+@pytest.mark.django_db
+def test_open_circuits_postpone_deliveries_without_counting_attempts(settings, monkeypatch, webhook):
+    """Deliveries not sent because the circuit is open wait for it to close, and keep all their attempts."""
+    settings.WEBHOOKS_MAX_ATTEMPTS = 1
+    settings.WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD = 1
+    settings.WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT = 600
+    cache.clear()
+    circuit_breaker.record_failure(webhook.webhook_url)
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", pytest.fail)
+    deliveries.enqueue(webhook, webhook.event, {})
+
+    for _ in range(3):
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        assert deliveries.dispatch_pending() == 1
+
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.STATUS_PENDING
+    assert delivery.attempts == 0
+    assert "Circuit open" in delivery.last_error
+    assert delivery.next_attempt_at > timezone.now() + timedelta(seconds=590)
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_client_errors_are_not_retried(monkeypatch, webhook):
+    """Client errors other than timeouts and rate limits fail right away."""
+    monkeypatch.setattr(deliveries, "send", lambda *args, **kwargs: _response(404))
+    deliveries.enqueue(webhook, webhook.event, {})
+
+    deliveries.dispatch_pending()
+
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.STATUS_FAILED
+    assert delivery.status_code == 404
+
+
+def test_retry_delay_is_capped_exponential_with_jitter(settings):
+    """Retry delays are random up to a cap that doubles after each attempt."""
+    settings.WEBHOOKS_RETRY_BASE_DELAY = 10
+    settings.WEBHOOKS_RETRY_MAX_DELAY = 60
+
+    delays = [deliveries.retry_delay(3) for _ in range(200)]
+
+    assert all(0 <= delay <= 40 for delay in delays)
+    assert len(set(delays)) > 1
+    assert all(deliveries.retry_delay(10) <= 60 for _ in range(200))
+
+
+@pytest.mark.django_db
+def test_failed_inline_deliveries_are_stored_for_retry(monkeypatch, webhook, django_capture_on_commit_callbacks):
+    """Without the outbox, failed calls don't raise in the request and are retried by the dispatcher."""
+    def failing_send(*args, **kwargs):
+        raise requests.exceptions.Timeout("timed out")
+
+    monkeypatch.setattr("openedx_webhooks.deferred.send", failing_send)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _process_event("SESSION_LOGIN_COMPLETED", UserData(id=4, is_active=True), metadata=Metadata("login"))
+
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.STATUS_PENDING
+    assert delivery.attempts == 1
+    assert delivery.next_attempt_at is not None
+
+
+@pytest.mark.django_db
+def test_inline_deliveries_to_open_circuits_are_postponed(
+    settings, monkeypatch, webhook, django_capture_on_commit_callbacks,
+):
+    """Without the outbox, calls skipped by an open circuit wait for it to close, without counting an attempt."""
+    settings.WEBHOOKS_CIRCUIT_BREAKER_THRESHOLD = 1
+    settings.WEBHOOKS_CIRCUIT_BREAKER_RESET_TIMEOUT = 600
+    cache.clear()
+    circuit_breaker.record_failure(webhook.webhook_url)
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", pytest.fail)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _process_event("SESSION_LOGIN_COMPLETED", UserData(id=4, is_active=True), metadata=Metadata("login"))
+
+    delivery = WebhookDelivery.objects.get()
+    assert delivery.status == WebhookDelivery.STATUS_PENDING
+    assert delivery.attempts == 0
+    assert "Circuit open" in delivery.last_error
+    assert delivery.next_attempt_at > timezone.now() + timedelta(seconds=590)
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_batched_webhooks_are_sent_in_one_request(monkeypatch):
+    """Deliveries of batched webhooks are queued, and sent together once the batch is full."""
+    Webhook.objects.create(
+        event="SESSION_LOGIN_COMPLETED",
+        webhook_url="https://example.com/batch",
+        batch_format=Webhook.BATCH_JSON,
+        batch_max_items=2,
+        batch_max_age=60,
+    )
+    config.invalidate()
+    sent = []
+
+    def fake_send(url, payload, content_type='application/json', **kwargs):
+        sent.append((url, json.loads(payload.json), content_type))
+        return _response(200)
+
+    monkeypatch.setattr(deliveries, "send", fake_send)
+    monkeypatch.setattr("openedx_webhooks.deferred.send", pytest.fail)
+    for user_id in (1, 2, 3):
+        _process_event("SESSION_LOGIN_COMPLETED", UserData(id=user_id, is_active=True), metadata=Metadata("login"))
+
+    assert deliveries.dispatch_pending() == 2
+    [(url, body, content_type)] = sent
+    assert url == "https://example.com/batch"
+    assert content_type == "application/json"
+    assert [item[f"{__name__}.UserData"]["id"] for item in body] == [1, 2]
+    assert WebhookDelivery.objects.filter(status=WebhookDelivery.STATUS_DELIVERED).count() == 2
+
+    # The last delivery waits for more events until the batch is old enough
+    assert deliveries.dispatch_pending() == 0
+    Webhook.objects.update(batch_max_age=0)
+    assert deliveries.dispatch_pending() == 1
+    assert [item[f"{__name__}.UserData"]["id"] for item in sent[1][1]] == [3]
+
+
+@pytest.mark.django_db
+def test_batches_are_cut_at_the_maximum_size_and_record_failures(settings, monkeypatch):
+    """NDJSON batches don't go over the maximum bytes, and a failed request is recorded in all its deliveries."""
+    settings.WEBHOOKS_MAX_ATTEMPTS = 1
+    webhook = Webhook.objects.create(
+        event="SESSION_LOGIN_COMPLETED",
+        webhook_url="https://example.com/batch",
+        batch_format=Webhook.BATCH_NDJSON,
+        batch_max_bytes=45,
+    )
+    bodies = []
+
+    def fake_send(url, payload, content_type='application/json', **kwargs):
+        bodies.append((payload.json, content_type))
+        return _response(500)
+
+    monkeypatch.setattr(deliveries, "send", fake_send)
+    for user_id in (1, 2, 3):
+        deliveries.enqueue(webhook, webhook.event, {"user": {"id": user_id}})
+
+    assert deliveries.dispatch_pending() == 2
+    [(body, content_type)] = bodies
+    assert content_type == "application/x-ndjson"
+    assert body.endswith(b"\n")
+    assert [json.loads(line) for line in body.splitlines()] == [{"user": {"id": 1}}, {"user": {"id": 2}}]
+    assert set(WebhookDelivery.objects.values_list("status", "status_code")) == {
+        (WebhookDelivery.STATUS_FAILED, 500), (WebhookDelivery.STATUS_PENDING, None),
+    }
+
+
+@attr.s(frozen=True)
+class XBlockData:
+    """Event data stub with an entity key."""
+
+    usage_key = attr.ib(type=str)
+    version = attr.ib(type=int)
+
+
+@pytest.mark.django_db
+def test_updates_of_the_same_entity_are_coalesced(monkeypatch):
+    """Events of the same entity in the coalesce window are merged in one delivery with the latest data."""
+    Webhook.objects.create(event="XBLOCK_UPDATED", webhook_url="https://example.com/hook", coalesce_window=30)
+    config.invalidate()
+    monkeypatch.setattr("openedx_webhooks.deferred.send", pytest.fail)
+
+    for version in (1, 2, 3):
+        _process_event("XBLOCK_UPDATED", XBlockData("block-v1:edX+A+B+type@html+block@1", version),
+                       metadata=Metadata("updated"))
+    _process_event("XBLOCK_UPDATED", XBlockData("block-v1:edX+A+B+type@html+block@2", 1),
+                   metadata=Metadata("updated"))
+
+    first, second = WebhookDelivery.objects.order_by("created")
+    payload = json.loads(first.payload)
+    assert first.entity_key == "block-v1:edX+A+B+type@html+block@1"
+    assert first.coalesced_events == payload["coalesced_events"] == 3
+    assert payload[f"{__name__}.XBlockData"]["version"] == 3
+    assert second.coalesced_events == 1
+
+    # The delivery is sent when the window ends
+    assert deliveries.dispatch_pending() == 0
+    monkeypatch.setattr(deliveries, "send", lambda *args, **kwargs: _response(200))
+    WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+    assert deliveries.dispatch_pending() == 2
+
+
+@pytest.mark.django_db
+def test_prune_deletes_old_finished_deliveries(settings, webhook):
+    """Delivered and failed deliveries are deleted after the retention, pending ones are kept."""
+    settings.WEBHOOKS_DELIVERY_RETENTION = 3600
+    old = timezone.now() - timedelta(hours=2)
+    for status in (WebhookDelivery.STATUS_DELIVERED, WebhookDelivery.STATUS_FAILED, WebhookDelivery.STATUS_PENDING):
+        deliveries.enqueue(webhook, "SESSION_LOGIN_COMPLETED", {"status": status})
+        WebhookDelivery.objects.filter(payload__contains=status).update(status=status, modified=old)
+    recent = deliveries.enqueue(webhook, "SESSION_LOGIN_COMPLETED", {})
+    WebhookDelivery.objects.filter(pk=recent.pk).update(status=WebhookDelivery.STATUS_DELIVERED)
+
+    assert deliveries.prune() == 2
+    assert sorted(WebhookDelivery.objects.values_list("status", flat=True)) == [
+        WebhookDelivery.STATUS_DELIVERED, WebhookDelivery.STATUS_PENDING,
+    ]
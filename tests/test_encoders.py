@@ -0,0 +1,70 @@
+"""
+Tests for the `openedx_webhooks.encoders` module.
+"""
+import json
+from datetime import datetime, timezone
+from uuid import UUID
+
+import attr
+import pytest
+from opaque_keys.edx.keys import CourseKey
+
+from openedx_webhooks import encoders
+from openedx_webhooks.utils import Payload
+
+
+@attr.s(frozen=True)
+class CourseData:
+    course_key = attr.ib(type=CourseKey)
+    display_name = attr.ib(type=str)
+
+
+def _data():
+    course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+    return {
+        "course": {"course_key": course_key, "start": datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)},
+        "id": UUID("457f0c26-a1a5-11ed-afe6-0242ac140007"),
+        "data": CourseData(course_key, "Démo"),
+        "grades": {1: 0.5},
+        "big": 2 ** 70,
+    }
+
+
+def _encode_json(data):
+    return b"custom"
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_encoders_produce_the_same_data(name):
+    """Attrs instances are sent as dicts, and datetimes and other objects as strings, as before the encoders."""
+    pytest.importorskip(name)
+
+    assert json.loads(encoders.get_encoder(name)(_data())) == {
+        "course": {"course_key": "course-v1:edX+DemoX+Demo_Course", "start": "2024-01-01 12:30:00+00:00"},
+        "id": "457f0c26-a1a5-11ed-afe6-0242ac140007",
+        "data": {"course_key": "course-v1:edX+DemoX+Demo_Course", "display_name": "Démo"},
+        "grades": {"1": 0.5},
+        "big": 2 ** 70,
+    }
+
+
+def test_auto_prefers_orjson(settings):
+    """The default encoder is orjson when it is installed."""
+    settings.WEBHOOKS_JSON_ENCODER = "auto"
+    expected = encoders.encode_orjson if encoders.orjson is not None else encoders.encode_stdlib
+
+    assert encoders.get_encoder() is expected
+
+
+def test_payload_uses_the_configured_encoder(settings):
+    """Encoders can be set by dotted path."""
+    settings.WEBHOOKS_JSON_ENCODER = f"{__name__}._encode_json"
+
+    assert Payload({"a": 1}).json == b"custom"
+
+
+def test_form_payloads_are_the_same_after_the_outbox():
+    """Datetimes are flattened the same way whether the payload is sent right away or from the outbox."""
+    payload = Payload({"course": {"start": datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)}})
+
+    assert Payload.from_json(payload.json).form == payload.form == {"course_start": "2024-01-01 12:30:00+00:00"}
@@ -0,0 +1,116 @@
+"""
+Tests for the `openedx_webhooks.fanout` module.
+"""
+import threading
+
+import pytest
+
+from openedx_webhooks import fanout
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    fanout.shutdown()
+    yield
+    fanout.shutdown()
+
+
+def test_calls_run_concurrently_and_keep_their_order():
+    """Calls to different hosts run at the same time, and results follow the order of the items."""
+    barrier = threading.Barrier(3, timeout=5)
+
+    def call(url):
+        barrier.wait()
+        return url
+
+    urls = ["https://a.example.com", "https://b.example.com", "https://c.example.com"]
+    futures = fanout.fan_out(call, urls, url=lambda url: url)
+
+    assert [future.result() for future in futures] == urls
+
+
+def test_concurrent_calls_are_limited_per_host(settings):
+    """No more than WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST calls run at the same time to a host."""
+    settings.WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST = 1
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def call(url):
+        with lock:
+            in_flight.append(url)
+            peak.append(len(in_flight))
+        threading.Event().wait(0.05)
+        with lock:
+            in_flight.remove(url)
+
+    urls = ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    for future in fanout.fan_out(call, urls, url=lambda url: url):
+        future.result()
+
+    assert max(peak) == 1
+
+
+def test_calls_waiting_for_a_busy_host_dont_block_other_hosts(settings):
+    """Calls queued for a saturated host don't use the slots of the process needed by calls to other hosts."""
+    settings.WEBHOOKS_MAX_CONCURRENT_REQUESTS = 2
+    settings.WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST = 1
+    release = threading.Event()
+
+    def call(url):
+        if "slow" in url:
+            release.wait(5)
+        return url
+
+    slow_urls = ["https://slow.example.com/a", "https://slow.example.com/b", "https://slow.example.com/c"]
+    slow_futures = fanout.fan_out(call, slow_urls, url=lambda url: url)
+
+    other = []
+    thread = threading.Thread(target=lambda: other.extend(
+        future.result() for future in fanout.fan_out(call, ["https://fast.example.com"], url=lambda url: url)
+    ))
+    thread.start()
+    thread.join(timeout=1)
+    release.set()
+
+    assert other == ["https://fast.example.com"]
+    assert [future.result() for future in slow_futures] == slow_urls
+
+
+def test_bursts_to_a_busy_host_dont_use_the_pool_needed_by_other_hosts(settings):
+    """Calls queued for a saturated host don't hold the threads of the pool needed by calls to other hosts."""
+    settings.WEBHOOKS_MAX_CONCURRENT_REQUESTS = 2
+    settings.WEBHOOKS_MAX_CONCURRENT_REQUESTS_PER_HOST = 1
+    release = threading.Event()
+
+    def call(url):
+        if "slow" in url:
+            release.wait(5)
+        return url
+
+    slow_urls = ["https://slow.example.com/a", "https://slow.example.com/b", "https://slow.example.com/c"]
+    slow_futures = fanout.fan_out(call, slow_urls, url=lambda url: url)
+
+    fast_urls = ["https://a.example.com", "https://b.example.com"]
+    fast_futures = fanout.fan_out(call, fast_urls, url=lambda url: url)
+    try:
+        assert [future.result(timeout=1) for future in fast_futures] == fast_urls
+        assert not any(future.done() for future in slow_futures)
+    finally:
+        release.set()
+
+    assert [future.result(timeout=5) for future in slow_futures] == slow_urls
+
+
+def test_exceptions_are_raised_by_their_future():
+    """An exception in one call doesn't affect the others."""
+    def call(url):
+        if url.endswith("fail"):
+            raise ValueError(url)
+        return url
+
+    futures = fanout.fan_out(call, ["https://a.example.com/fail", "https://b.example.com"], url=lambda url: url)
+
+    with pytest.raises(ValueError):
+        futures[0].result()
+    assert futures[1].result() == "https://b.example.com"
@@ -0,0 +1,283 @@
+"""
+Tests for the `openedx_webhooks.filters` module.
+
+The edx-platform modules imported by the filters are replaced by stubs, as the platform is not installed.
+"""
+import importlib
+import json
+import sys
+import threading
+import time
+import types
+from types import SimpleNamespace
+
+import pytest
+
+from openedx_webhooks import batching
+from openedx_webhooks.models import Webhook
+from openedx_webhooks.request_cache import request_scope
+
+PLATFORM_MODULES = {
+    "common.djangoapps.student.models": {"UserProfile": object},
+    "lms.djangoapps.courseware.courses": {"get_course_blocks_completion_summary": lambda course_key, user: {}},
+}
+
+
+@pytest.fixture(name="filters", scope="module")
+def fixture_filters():
+    with pytest.MonkeyPatch.context() as mp:
+        for path, attributes in PLATFORM_MODULES.items():
+            parts = path.split(".")
+            for i in range(1, len(parts) + 1):
+                name = ".".join(parts[:i])
+                if name not in sys.modules:
+                    mp.setitem(sys.modules, name, types.ModuleType(name))
+            for attribute, value in attributes.items():
+                mp.setattr(sys.modules[path], attribute, value, raising=False)
+        yield importlib.import_module("openedx_webhooks.filters")
+
+
+class Halt(Exception):
+    """Exception of a filter stub."""
+
+    def __init__(self, message, redirect_to=None, status_code=None):
+        super().__init__(message)
+        self.redirect_to = redirect_to
+        self.status_code = status_code
+
+
+def _webfilter(pk, url, **kwargs):
+    return SimpleNamespace(**{
+        "pk": pk, "event": "LMSPageURLRequested", "webhook_url": url, "condition": "", "payload_fields": "",
+        "connect_timeout": 1, "read_timeout": 1, "use_www_form_encoding": False, "request_compression": "",
+        "response_cache_ttl": 0, "memoize_in_request": False, "batch_children": False,
+        "disable_filtering": False, "disable_halt": False, "halt_on_4xx": False, "halt_on_5xx": False,
+        "halt_on_request_exception": False, "redirect_on_request_exception": "", **kwargs,
+    })
+
+
+def _response(name):
+    text = json.dumps({"data": {"url": name}, "exception": {"Reason": name}})
+    return SimpleNamespace(status_code=200, reason="OK", text=text)
+
+
+def test_concurrent_responses_are_merged_in_the_configured_order(filters, settings, monkeypatch):
+    """The response of the last configured webfilter wins, even when it arrives first."""
+    settings.WEBHOOKS_CONCURRENT_WEBFILTERS = True
+    second_done = threading.Event()
+    finished = []
+
+    def fake_send(url, payload, **kwargs):
+        if url.endswith("first"):
+            assert second_done.wait(5)
+        finished.append(url)
+        if url.endswith("second"):
+            second_done.set()
+        return _response(url.rsplit("/", 1)[1])
+
+    monkeypatch.setattr(filters, "send", fake_send)
+    webfilters = [_webfilter(1, "https://a.example.com/first"), _webfilter(2, "https://b.example.com/second")]
+
+    data, exceptions = filters._process_filter(webfilters, {"url": "/page"})  # pylint: disable=protected-access
+
+    assert finished == ["https://b.example.com/second", "https://a.example.com/first"]
+    assert data == {"url": "second"}
+    assert exceptions == {"Reason": "second"}
+
+
+def test_pipeline_deadline_is_set_for_each_event(filters, settings):
+    """The budget can be the same for all the events, or set for some of them."""
+    settings.WEBHOOKS_WEBFILTER_PIPELINE_TIMEOUT = None
+    assert filters._get_pipeline_deadline("LMSPageURLRequested") is None  # pylint: disable=protected-access
+
+    settings.WEBHOOKS_WEBFILTER_PIPELINE_TIMEOUT = {"DashboardRenderStarted": 0.5}
+    assert filters._get_pipeline_deadline("LMSPageURLRequested") is None  # pylint: disable=protected-access
+    deadline = filters._get_pipeline_deadline("DashboardRenderStarted")  # pylint: disable=protected-access
+    assert 0 < deadline - time.monotonic() <= 0.5
+
+
+def test_webfilters_after_the_budget_are_skipped_with_their_exception_settings(filters, settings, monkeypatch):
+    """Timeouts are reduced to the time left, and webfilters that can't be called in time halt as configured."""
+    settings.WEBHOOKS_CONCURRENT_WEBFILTERS = False
+    settings.WEBHOOKS_WEBFILTER_PIPELINE_TIMEOUT = {"LMSPageURLRequested": 0.2}
+    sent = []
+
+    def fake_send(url, payload, timeout, **kwargs):
+        sent.append((url, timeout))
+        time.sleep(0.3)
+        return _response("slow")
+
+    monkeypatch.setattr(filters, "send", fake_send)
+    webfilters = [
+        _webfilter(1, "https://a.example.com/slow"),
+        _webfilter(2, "https://b.example.com/skipped", halt_on_request_exception=True,
+                   redirect_on_request_exception="/timeout"),
+    ]
+
+    with pytest.raises(Halt) as exc_info:
+        filters._process_filter(webfilters, {"url": "/page"}, exception=Halt)  # pylint: disable=protected-access
+
+    [(url, timeout)] = sent
+    assert url == "https://a.example.com/slow"
+    assert all(0 < seconds <= 0.2 for seconds in timeout)
+    assert exc_info.value.redirect_to == "/timeout"
+    assert "Time budget" in str(exc_info.value)
+
+
+def test_concurrent_webfilters_are_not_waited_for_after_the_budget(filters, settings, monkeypatch):
+    """Responses that don't arrive in time are skipped, and the ones that did are still applied."""
+    settings.WEBHOOKS_CONCURRENT_WEBFILTERS = True
+    settings.WEBHOOKS_WEBFILTER_PIPELINE_TIMEOUT = 0.2
+    release = threading.Event()
+
+    def fake_send(url, payload, **kwargs):
+        if url.endswith("slow"):
+            release.wait(5)
+        return _response(url.rsplit("/", 1)[1])
+
+    monkeypatch.setattr(filters, "send", fake_send)
+    webfilters = [_webfilter(1, "https://a.example.com/fast"), _webfilter(2, "https://b.example.com/slow")]
+
+    start = time.monotonic()
+    try:
+        data, _ = filters._process_filter(  # pylint: disable=protected-access
+            webfilters, {"url": "/page"}, exception=Halt,
+        )
+    finally:
+        release.set()
+
+    assert time.monotonic() - start < 2
+    assert data == {"url": "fast"}
+
+
+class Block:
+    """XBlock stub, with the children of its vertical."""
+
+    listed = []
+
+    def __init__(self, usage_id, vertical=None):
+        self.scope_ids = SimpleNamespace(usage_id=usage_id)
+        self.display_name = usage_id
+        self._vertical = vertical
+
+    def get_parent(self):
+        return self._vertical
+
+    def get_children(self):
+        Block.listed.append(self.scope_ids.usage_id)
+        return CHILDREN
+
+
+VERTICAL = Block("vertical")
+CHILDREN = [Block(f"child-{n}", VERTICAL) for n in range(3)]
+
+
+def test_vertical_children_share_one_call_and_apply_their_own_response(filters, monkeypatch):
+    """The first child calls the URL for the whole vertical, and each child is hidden or updated by its response."""
+    webfilter = _webfilter(1, "https://example.com/children", event="VerticalBlockChildRenderStarted",
+                           batch_children=True)
+    posted = []
+
+    def fake_send(url, payload, **kwargs):
+        posted.append(json.loads(payload.json))
+        return SimpleNamespace(status_code=200, reason="OK", text=json.dumps([
+            {"data": {"context": {"highlight": True}}},
+            {"exception": {"PreventChildBlockRender": "hidden"}},
+            {},
+        ]))
+
+    monkeypatch.setattr(filters, "get_webfilters", lambda event: [webfilter])
+    monkeypatch.setattr(filters, "send", pytest.fail)
+    monkeypatch.setattr(batching, "send", fake_send)
+    monkeypatch.setattr(Block, "listed", [])
+    step = filters.VerticalBlockChildRenderStartedWebFilter(
+        "org.openedx.learning.vertical_block_child.render.started.v1", [],
+    )
+
+    with request_scope():
+        first = step.run_filter(block=CHILDREN[0], context={})
+        with pytest.raises(filters.VerticalBlockChildRenderStarted.PreventChildBlockRender):
+            step.run_filter(block=CHILDREN[1], context={})
+        third = step.run_filter(block=CHILDREN[2], context={})
+
+    [body] = posted
+    assert len(body) == 3
+    assert Block.listed == ["vertical"]
+    assert first["context"] == {"highlight": True}
+    assert third["context"] == {}
+
+
+def _streamed_body(payload):
+    return json.loads(b"".join(payload.chunks()))
+
+
+@pytest.mark.django_db
+def test_streamed_querysets_send_only_the_requested_fields_of_the_rows(filters, settings, monkeypatch):
+    """The rows are fetched with the fields requested under the key of the QuerySet, and the rest is sent as usual."""
+    settings.WEBHOOKS_STREAM_CHUNK_SIZE = 1
+    for event in ("COURSE_ENROLLMENT_CREATED", "SESSION_LOGIN_COMPLETED"):
+        Webhook.objects.create(event=event, webhook_url=f"https://example.com/{event}")
+    bodies = []
+
+    def fake_send(url, payload, **kwargs):
+        bodies.append(_streamed_body(payload))
+        return _response("streamed")
+
+    monkeypatch.setattr(filters, "send", fake_send)
+    webfilters = [
+        _webfilter(1, "https://a.example.com/fields", payload_fields="enrollments.event, course_id"),
+        _webfilter(2, "https://b.example.com/all"),
+    ]
+    data = {"enrollments": Webhook.objects.order_by("event"), "course_id": "course-v1:edX+DemoX+Demo_Course"}
+
+    filters._process_filter(webfilters, data, stream="enrollments")  # pylint: disable=protected-access
+
+    fields, full = bodies
+    assert fields["enrollments"] == [{"event": "COURSE_ENROLLMENT_CREATED"}, {"event": "SESSION_LOGIN_COMPLETED"}]
+    assert fields["course_id"] == "course-v1:edX+DemoX+Demo_Course"
+    assert "event_metadata" in fields
+    assert [row["webhook_url"] for row in full["enrollments"]] == [
+        "https://example.com/COURSE_ENROLLMENT_CREATED", "https://example.com/SESSION_LOGIN_COMPLETED",
+    ]
+
+
+@pytest.mark.django_db
+def test_streamed_querysets_are_sent_from_the_calling_thread(filters, settings, monkeypatch):
+    """Concurrent webfilters are called one after the other when streaming, to use the connection of the caller."""
+    settings.WEBHOOKS_CONCURRENT_WEBFILTERS = True
+    threads = []
+
+    def fake_send(url, payload, **kwargs):
+        threads.append(threading.get_ident())
+        _streamed_body(payload)
+        return _response("streamed")
+
+    monkeypatch.setattr(filters, "send", fake_send)
+    webfilters = [_webfilter(1, "https://a.example.com/first"), _webfilter(2, "https://b.example.com/second")]
+
+    filters._process_filter(  # pylint: disable=protected-access
+        webfilters, {"enrollments": Webhook.objects.all()}, stream="enrollments",
+    )
+
+    assert threads == [threading.get_ident()] * 2
+
+
+@pytest.mark.django_db
+def test_querysets_are_not_fetched_when_not_sent(filters, monkeypatch, django_assert_num_queries):
+    """Without webfilters, or when they don't request the QuerySet, its rows are never fetched."""
+    step = filters.CourseEnrollmentQuerysetRequestedWebFilter(
+        "org.openedx.learning.course_enrollment_queryset.requested.v1", [],
+    )
+    sent = []
+    monkeypatch.setattr(filters, "send", lambda url, payload, **kwargs: sent.append(payload.data) or _response("x"))
+
+    with django_assert_num_queries(0):
+        monkeypatch.setattr(filters, "get_webfilters", lambda event: [])
+        step.run_filter(enrollments=Webhook.objects.all())
+
+        webfilter = _webfilter(1, "https://example.com/other", payload_fields="course_id")
+        filters._process_filter(  # pylint: disable=protected-access
+            [webfilter], {"enrollments": Webhook.objects.all(), "course_id": "course"}, stream="enrollments",
+        )
+
+    assert [set(data) for data in sent] == [{"course_id", "event_metadata"}]
@@ -0,0 +1,96 @@
+"""
+Tests for the `openedx_webhooks.ledger` module.
+"""
+from datetime import timedelta
+from uuid import uuid4
+
+import attr
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from openedx_webhooks import config, ledger
+from openedx_webhooks.models import Webhook, WebhookDelivery, WebhookLedgerEntry
+from openedx_webhooks.receivers import _process_event
+
+
+@attr.s(frozen=True)
+class UserData:
+    id = attr.ib(type=int)
+
+
+@attr.s(frozen=True)
+class Metadata:
+    id = attr.ib()
+    event_type = attr.ib(type=str)
+
+
+@pytest.fixture(name="webhook")
+def fixture_webhook():
+    ledger.clear_cache()
+    webhook = Webhook.objects.create(event="SESSION_LOGIN_COMPLETED", webhook_url="https://example.com/hook")
+    config.invalidate()
+    return webhook
+
+
+@pytest.mark.django_db
+def test_claim_accepts_each_event_once_per_webhook(webhook, django_capture_on_commit_callbacks):
+    """An event can be claimed once per webhook, and duplicates seen by the process don't query the database."""
+    other = Webhook.objects.create(event="SESSION_LOGIN_COMPLETED", webhook_url="https://example.com/other")
+    event_id = uuid4()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert ledger.claim(event_id, webhook)
+        assert ledger.claim(event_id, other)
+    with CaptureQueriesContext(connection) as queries:
+        assert not ledger.claim(event_id, webhook)
+    assert not queries.captured_queries
+
+    # Other processes find the entry in the database
+    ledger.clear_cache()
+    assert not ledger.claim(event_id, webhook)
+    assert WebhookLedgerEntry.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_rolled_back_claims_are_forgotten(webhook, django_capture_on_commit_callbacks):
+    """An event whose claim was rolled back, with its delivery, can be claimed again."""
+    event_id = uuid4()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                assert ledger.claim(event_id, webhook)
+                raise RuntimeError("request failed")
+
+    assert not WebhookLedgerEntry.objects.exists()
+    assert ledger.claim(event_id, webhook)
+
+
+@pytest.mark.django_db
+def test_duplicate_events_are_delivered_once(settings, webhook):
+    """With deduplication enabled, an event sent twice is delivered once."""
+    settings.WEBHOOKS_USE_OUTBOX = True
+    settings.WEBHOOKS_DEDUPLICATE_EVENTS = True
+    metadata = Metadata(uuid4(), "login")
+
+    _process_event("SESSION_LOGIN_COMPLETED", UserData(4), metadata=metadata)
+    _process_event("SESSION_LOGIN_COMPLETED", UserData(4), metadata=metadata)
+    _process_event("SESSION_LOGIN_COMPLETED", UserData(4), metadata=Metadata(uuid4(), "login"))
+
+    assert WebhookDelivery.objects.filter(webhook=webhook).count() == 2
+
+
+@pytest.mark.django_db
+def test_prune_deletes_old_entries(settings, webhook):
+    """Entries older than the retention are deleted."""
+    settings.WEBHOOKS_LEDGER_RETENTION = 3600
+    ledger.claim(uuid4(), webhook)
+    ledger.claim(uuid4(), webhook)
+    WebhookLedgerEntry.objects.filter(pk=WebhookLedgerEntry.objects.first().pk).update(
+        created=timezone.now() - timedelta(hours=2)
+    )
+
+    assert ledger.prune() == 1
+    assert WebhookLedgerEntry.objects.count() == 1
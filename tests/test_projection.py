@@ -0,0 +1,86 @@
+"""
+Tests for the `openedx_webhooks.projection` module.
+"""
+import json
+from types import SimpleNamespace
+
+import attr
+import pytest
+from django.core.exceptions import ValidationError
+
+from openedx_webhooks import config
+from openedx_webhooks.models import Webhook, WebhookDelivery
+from openedx_webhooks.projection import compile_fields, project, validate_fields
+from openedx_webhooks.receivers import _process_event
+
+
+@attr.s(frozen=True)
+class UserPersonalData:
+    username = attr.ib(type=str)
+    email = attr.ib(type=str)
+
+
+@attr.s(frozen=True)
+class UserData:
+    id = attr.ib(type=int)
+    is_active = attr.ib(type=bool)
+    pii = attr.ib(type=UserPersonalData)
+
+
+@attr.s(frozen=True)
+class Metadata:
+    event_type = attr.ib(type=str)
+
+
+def test_compile_fields_builds_a_tree():
+    """Paths are split on commas and whitespace, and a shorter path selects the whole value."""
+    assert compile_fields("") is None
+    assert compile_fields("user.pii.email, user.id\ncourse course.display_name") == {
+        "user": {"pii": {"email": None}, "id": None},
+        "course": None,
+    }
+
+
+def test_validate_fields_rejects_invalid_and_private_paths():
+    """Only dotted paths of public names are accepted."""
+    validate_fields("user.pii.email, course_key")
+
+    with pytest.raises(ValidationError):
+        validate_fields("user._state, user..id")
+
+
+def test_project_keeps_only_the_requested_fields():
+    """Mappings, objects and lists are walked, and missing fields are left out."""
+    data = {
+        "course": SimpleNamespace(display_name="Demo", org="edX", details={"overview": "..."}),
+        "blocks": [{"id": 1, "title": "One"}, {"id": 2, "title": "Two"}],
+    }
+
+    assert project(data, compile_fields("course.display_name, course.missing, blocks.id")) == {
+        "course": {"display_name": "Demo"},
+        "blocks": [{"id": 1}, {"id": 2}],
+    }
+
+
+@pytest.mark.django_db
+def test_webhooks_receive_only_their_fields(settings):
+    """Each webhook gets the event data projected on its fields, and the whole event metadata."""
+    settings.WEBHOOKS_USE_OUTBOX = True
+    Webhook.objects.create(event="SESSION_LOGIN_COMPLETED", webhook_url="https://example.com/all")
+    Webhook.objects.create(event="SESSION_LOGIN_COMPLETED", webhook_url="https://example.com/email",
+                           payload_fields="pii.email")
+    config.invalidate()
+
+    user = UserData(id=4, is_active=True, pii=UserPersonalData("andres", "andres@example.com"))
+    _process_event("SESSION_LOGIN_COMPLETED", user, metadata=Metadata("login"))
+
+    payloads = {
+        delivery.webhook.webhook_url: json.loads(delivery.payload)
+        for delivery in WebhookDelivery.objects.select_related("webhook")
+    }
+    data_type = f"{__name__}.UserData"
+    assert payloads["https://example.com/all"][data_type]["pii"]["username"] == "andres"
+    assert payloads["https://example.com/email"] == {
+        data_type: {"pii": {"email": "andres@example.com"}},
+        "event_metadata": {"event_type": "login"},
+    }
@@ -0,0 +1,57 @@
+"""
+Tests for the `openedx_webhooks.request_cache` module.
+"""
+from types import SimpleNamespace
+
+from openedx_webhooks.request_cache import RequestScopeMiddleware, get_scope, request_scope
+from openedx_webhooks.utils import Payload
+
+WEBFILTER = SimpleNamespace(pk=1, webhook_url="https://example.com/filter", memoize_in_request=True)
+
+
+def _payload(block, time):
+    return Payload({"block": block, "event_metadata": {"event_type": "RenderXBlockStarted", "time": time}})
+
+
+def test_responses_are_reused_inside_the_scope():
+    """Identical payloads of the same request reuse the response, whatever their event metadata."""
+    response = SimpleNamespace(status_code=200)
+
+    with request_scope() as scope:
+        scope.store(WEBFILTER, _payload("a", "1"), response)
+
+        assert scope.get(WEBFILTER, _payload("a", "2")) is response
+        assert scope.get(WEBFILTER, _payload("b", "2")) is None
+        assert scope.get(SimpleNamespace(pk=2, webhook_url="", memoize_in_request=True), _payload("a", "2")) is None
+
+    assert get_scope() is None
+
+
+def test_responses_are_only_reused_for_webfilters_that_memoize():
+    """Webfilters whose response may change for the same data are called every time."""
+    webfilter = SimpleNamespace(pk=3, webhook_url="https://example.com/counter", memoize_in_request=False)
+
+    with request_scope() as scope:
+        scope.store(webfilter, _payload("a", "1"), SimpleNamespace(status_code=200))
+
+        assert scope.get(webfilter, _payload("a", "2")) is None
+        assert not scope.responses
+
+
+def test_nested_scopes_share_the_outermost_one():
+    with request_scope() as outer:
+        with request_scope() as inner:
+            assert inner is outer
+        assert get_scope() is outer
+
+
+def test_middleware_opens_a_scope_for_each_request():
+    scopes = []
+    middleware = RequestScopeMiddleware(lambda request: scopes.append(get_scope()) or "response")
+
+    assert middleware(object()) == "response"
+    assert middleware(object()) == "response"
+
+    assert None not in scopes
+    assert scopes[0] is not scopes[1]
+    assert get_scope() is None
@@ -0,0 +1,94 @@
+"""
+Tests for the `openedx_webhooks.response_cache` module.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from openedx_webhooks import response_cache
+from openedx_webhooks.models import Webfilter
+from openedx_webhooks.utils import Payload
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture(name="webfilter")
+def fixture_webfilter():
+    return Webfilter.objects.create(
+        event="LMSPageURLRequested",
+        webhook_url="https://example.com/filter",
+        response_cache_ttl=60,
+    )
+
+
+def _response(status_code=200, cache_control=None):
+    headers = {"Cache-Control": cache_control} if cache_control else {}
+    return SimpleNamespace(status_code=status_code, reason="OK", text='{"data": {"url": "/new"}}', headers=headers)
+
+
+def _payload(url, time):
+    return Payload({"url": url, "event_metadata": {"event_type": "LMSPageURLRequested", "time": time}})
+
+
+@pytest.mark.django_db
+def test_responses_are_reused_for_the_same_data(webfilter):
+    """The event metadata is not part of the key, and different data is not answered from the cache."""
+    response_cache.store(webfilter, _payload("/old", "1"), _response())
+
+    cached = response_cache.get(webfilter, _payload("/old", "2"))
+    assert (cached.status_code, cached.text, cached.ok) == (200, '{"data": {"url": "/new"}}', True)
+    assert response_cache.get(webfilter, _payload("/other", "2")) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("status_code, cache_control, ttl", [
+    (500, None, 60),
+    (200, "no-store", 60),
+    (200, "private, max-age=30", 60),
+    (200, None, 0),
+])
+def test_responses_not_cached(webfilter, status_code, cache_control, ttl):
+    """Errors, responses the server doesn't allow to cache and webfilters without TTL are not cached."""
+    webfilter.response_cache_ttl = ttl
+    response_cache.store(webfilter, _payload("/old", "1"), _response(status_code, cache_control))
+
+    webfilter.response_cache_ttl = 60
+    assert response_cache.get(webfilter, _payload("/old", "1")) is None
+
+
+@pytest.mark.django_db
+def test_responses_expire_with_the_shorter_max_age(webfilter, monkeypatch):
+    """The Cache-Control max-age of the server can shorten the TTL of the webfilter."""
+    now = 1000
+    monkeypatch.setattr("openedx_webhooks.response_cache.time.time", lambda: now)
+    response_cache.store(webfilter, _payload("/old", "1"), _response(cache_control="max-age=10"))
+
+    now = 1009
+    assert response_cache.get(webfilter, _payload("/old", "1")) is not None
+    now = 1011
+    assert response_cache.get(webfilter, _payload("/old", "1")) is None
+
+
+@pytest.mark.django_db
+def test_changing_the_webfilter_discards_its_responses(webfilter):
+    response_cache.store(webfilter, _payload("/old", "1"), _response())
+
+    webfilter.webhook_url = "https://example.com/other"
+    webfilter.save()
+
+    assert response_cache.get(webfilter, _payload("/old", "1")) is None
+
+
+@pytest.mark.django_db
+def test_responses_are_shared_through_the_django_cache(webfilter, settings):
+    """Other processes, with an empty local cache, reuse the responses of the shared cache."""
+    settings.WEBHOOKS_RESPONSE_CACHE_ALIAS = "default"
+    response_cache.store(webfilter, _payload("/old", "1"), _response())
+    response_cache.clear()
+
+    assert response_cache.get(webfilter, _payload("/old", "1")).status_code == 200
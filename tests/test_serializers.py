@@ -0,0 +1,151 @@
+"""
+Tests for the `openedx_webhooks.serializers` module.
+"""
+
+from datetime import date
+
+import attr
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from xblock.fields import ScopeIds
+
+from openedx_webhooks import serializers
+from openedx_webhooks.serializers import CIRCULAR_REFERENCE, DEPTH_LIMIT_REACHED, MAX_DEPTH, serialize
+
+
+@attr.s(frozen=True)
+class CourseData:
+    course_key = attr.ib(type=CourseKey)
+    display_name = attr.ib(type=str)
+    _internal = attr.ib(type=str, default="hidden")
+
+
+@attr.s(frozen=True, slots=True)
+class SlottedData:
+    name = attr.ib(type=str)
+
+
+class Block:
+    def __init__(self):
+        self.display_name = "Problem"
+        self.weight = 1.0
+        self._runtime = object()
+
+
+def test_serialize_scalars_and_keys():
+    """Scalars are kept as they are and opaque keys are stringified."""
+    course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+
+    assert serialize(None) is None
+    assert serialize(3) == 3
+    assert serialize(True) is True
+    assert serialize("text") == "text"
+    assert serialize(course_key) == "course-v1:edX+DemoX+Demo_Course"
+    assert serialize(date(2024, 1, 1)) == "2024-01-01"
+
+
+def test_serialize_scope_ids():
+    """ScopeIds are serialized with their string ids."""
+    usage_key = UsageKey.from_string("block-v1:edX+DemoX+Demo_Course+type@problem+block@p1")
+
+    assert serialize(ScopeIds(4, "problem", usage_key, usage_key)) == {
+        "block_type": "problem",
+        "def_id": str(usage_key),
+        "usage_id": str(usage_key),
+        "user_id": 4,
+    }
+
+
+def test_serialize_containers_and_objects_skip_private_keys():
+    """Sequences become lists, and dicts and objects become dicts of their public string keys."""
+    assert serialize((1, [2, {"a": 3, "_b": 4, 5: 6}])) == [1, [2, {"a": 3}]]
+    assert serialize({"block": Block()}) == {"block": {"display_name": "Problem", "weight": 1.0}}
+
+
+def test_serialize_attrs_classes():
+    """Attrs classes are serialized with their public fields, including slotted ones."""
+    course_key = CourseKey.from_string("course-v1:edX+DemoX+Demo_Course")
+
+    assert serialize(CourseData(course_key, "Demo")) == {
+        "course_key": "course-v1:edX+DemoX+Demo_Course",
+        "display_name": "Demo",
+    }
+    assert serialize(SlottedData("andres")) == {"name": "andres"}
+
+
+def test_plans_are_compiled_once_per_class(monkeypatch):
+    """The plan of a class is compiled the first time one of its objects is serialized."""
+    compiled = []
+    original_compile = serializers._compile  # pylint: disable=protected-access
+
+    def counting_compile(o):
+        compiled.append(type(o))
+        return original_compile(o)
+
+    monkeypatch.setattr(serializers, "_plans", {})
+    monkeypatch.setattr(serializers, "_compile", counting_compile)
+
+    serialize([Block(), Block(), Block()])
+
+    assert compiled.count(Block) == 1
+    assert compiled.count(float) == 1
+
+
+def test_serialize_stops_at_depth_limit():
+    """Nesting deeper than the limit is replaced by a marker."""
+    nested = "leaf"
+    for _ in range(MAX_DEPTH + 1):
+        nested = [nested]
+
+    value = serialize(nested)
+    for _ in range(MAX_DEPTH):
+        value = value[0]
+
+    assert value == [DEPTH_LIMIT_REACHED]
+
+
+def test_serialize_replaces_cycles_with_a_reference():
+    """An object reached again while it is being serialized is replaced by a marker."""
+    parent = Block()
+    child = Block()
+    child.parent = parent
+    parent.children = [child]
+    loop = {"name": "loop"}
+    loop["self"] = loop
+
+    assert serialize(parent) == {
+        "display_name": "Problem",
+        "weight": 1.0,
+        "children": [{"display_name": "Problem", "weight": 1.0, "parent": CIRCULAR_REFERENCE}],
+    }
+    assert serialize(loop) == {"name": "loop", "self": CIRCULAR_REFERENCE}
+
+
+def test_serialize_shared_objects_once(monkeypatch):
+    """An object shared by several parts of the structure is serialized once and its result reused."""
+    calls = []
+    original_object_plan = serializers._object_plan  # pylint: disable=protected-access
+
+    def counting_object_plan(o, depth, memo):
+        calls.append(o)
+        return original_object_plan(o, depth, memo)
+
+    monkeypatch.setattr(serializers, "_plans", {})
+    monkeypatch.setattr(serializers, "_object_plan", counting_object_plan)
+    shared = Block()
+
+    result = serialize({"first": shared, "second": [shared], "third": Block()})
+
+    assert result["first"] == result["second"][0] == result["third"]
+    assert len(calls) == 2
+
+
+def test_serialize_recomputes_results_cut_by_the_depth_limit():
+    """A result cut by the depth limit is not reused where the object is reached at a shallower depth."""
+    shared = {"value": [1]}
+    deep = shared
+    for _ in range(MAX_DEPTH - 1):
+        deep = [deep]
+
+    result = serialize({"deep": deep, "shallow": shared})
+
+    assert result["shallow"] == {"value": [1]}
@@ -43,6 +43,20 @@ def test_cms_plugin_settings_merges_existing_pipeline():
     ]
 
 
+def test_plugin_settings_add_the_request_scope_middleware_once():
+    """The middleware memoizing webfilter responses is added to the LMS and CMS."""
+    settings = Settings()
+    settings.MIDDLEWARE = ["django.middleware.common.CommonMiddleware"]
+
+    common.plugin_settings(settings)
+    cms.plugin_settings(settings)
+
+    assert settings.MIDDLEWARE == [
+        "django.middleware.common.CommonMiddleware",
+        "openedx_webhooks.request_cache.RequestScopeMiddleware",
+    ]
+
+
 def test_ulmo_signal_catalog_includes_new_upstream_events():
     """Ulmo signal catalog includes the newly added upstream events."""
     assert "COURSE_RERUN_COMPLETED" in signals["content_authoring"]
@@ -1,8 +1,18 @@
 """
 Tests for the `openedx_webhooks.utils` module.
 """
+import gzip
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
 
-from openedx_webhooks.utils import flatten_dict, send
+import pytest
+
+from openedx_webhooks import utils
+from openedx_webhooks.models import Webhook
+from openedx_webhooks.utils import Payload, StreamingPayload, close_sessions, flatten_dict, get_session, send
 
 
 def test_flatten_dict_uses_joined_keys():
@@ -22,9 +32,9 @@ def test_send_uses_form_encoded_payload_when_requested(monkeypatch):
         captured["data"] = data
         captured["headers"] = headers
         captured["timeout"] = timeout
-        return object()
+        return SimpleNamespace(status_code=200)
 
-    monkeypatch.setattr("openedx_webhooks.utils.requests.post", fake_post)
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", lambda url: SimpleNamespace(post=fake_post))
 
     send(
         "https://example.com/webhook",
@@ -36,3 +46,171 @@ def test_send_uses_form_encoded_payload_when_requested(monkeypatch):
     assert captured["data"] == {"user_name": "andres"}
     assert captured["headers"]["Content-type"] == "application/x-www-form-urlencoded"
     assert captured["timeout"] == 10
+
+
+def test_get_session_reuses_one_session_per_host():
+    """Calls to the same host share a pooled session, other hosts get their own."""
+    close_sessions()
+
+    session = get_session("https://example.com/webhook")
+
+    assert get_session("https://example.com/other") is session
+    assert get_session("https://other.example.com/webhook") is not session
+    assert session.get_adapter("https://example.com")._pool_maxsize == 10  # pylint: disable=protected-access
+
+    close_sessions()
+
+
+def test_get_session_recycles_idle_sessions(settings, monkeypatch):
+    """Sessions unused for longer than the idle timeout are replaced."""
+    close_sessions()
+    settings.WEBHOOKS_HTTP_SESSION_IDLE_TIMEOUT = 60
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "monotonic", lambda: now[0])
+
+    session = get_session("https://example.com/webhook")
+    now[0] += 30
+    assert get_session("https://example.com/webhook") is session
+    now[0] += 61
+    assert get_session("https://example.com/webhook") is not session
+
+    close_sessions()
+
+
+def test_sessions_do_not_send_back_received_cookies():
+    """A cookie set by the response to one call is not sent with the next calls to the same host."""
+    cookies = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            self.rfile.read(int(self.headers["Content-Length"]))
+            cookies.append(self.headers.get("Cookie"))
+            self.send_response(200)
+            self.send_header("Set-Cookie", "sessionid=user1; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    close_sessions()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/hook"
+        send(url, {"user": "one"})
+        send(url, {"user": "two"})
+    finally:
+        close_sessions()
+        server.shutdown()
+        server.server_close()
+
+    assert cookies == [None, None]
+
+
+def test_payload_is_encoded_once(monkeypatch):
+    """A payload shared by many calls is JSON encoded only once."""
+    calls = []
+    encode = utils.encoders.encode
+    monkeypatch.setattr(utils.encoders, "encode", lambda data: calls.append(data) or encode(data))
+    posted = []
+    session = SimpleNamespace(
+        post=lambda url, data, headers, timeout: posted.append(data) or SimpleNamespace(status_code=200)
+    )
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", lambda url: session)
+
+    payload = Payload({"user": {"name": "andres"}})
+    send("https://example.com/a", payload)
+    send("https://example.com/b", payload)
+
+    assert len(calls) == 1
+    assert posted[0] is posted[1]
+    assert json.loads(posted[0]) == {"user": {"name": "andres"}}
+
+
+def test_payload_from_json_decodes_lazily():
+    """Payloads loaded from JSON keep the original bytes and decode them on demand."""
+    payload = Payload.from_json('{"user": {"name": "andres"}}')
+
+    assert payload.json == b'{"user": {"name": "andres"}}'
+    assert payload.form == {"user_name": "andres"}
+
+
+@pytest.mark.parametrize("encoder", ["json", "orjson"])
+def test_payload_digest_reuses_the_json_without_the_event_metadata(settings, monkeypatch, encoder):
+    """The digest ignores the event metadata, and is taken from the JSON sent instead of a second encoding."""
+    pytest.importorskip(encoder)
+    settings.WEBHOOKS_JSON_ENCODER = encoder
+    encoded = []
+    encode = utils.encoders.encode
+    monkeypatch.setattr(utils.encoders, "encode", lambda data: encoded.append(data) or encode(data))
+
+    payload = Payload({"user": {"name": "andres"}, "event_metadata": {"time": "1"}})
+    digest = payload.digest
+    assert payload.json.startswith(b'{"user"')
+
+    assert len(encoded) == 1
+    assert digest == Payload({"user": {"name": "andres"}, "event_metadata": {"time": "2"}}).digest
+    assert digest != Payload({"user": {"name": "other"}, "event_metadata": {"time": "1"}}).digest
+
+
+def test_send_compresses_large_json_payloads(settings, monkeypatch):
+    """JSON payloads over the minimum size are compressed, and sent uncompressed to urls that reject them."""
+    settings.WEBHOOKS_COMPRESSION_MIN_SIZE = 100
+    posted = []
+
+    def fake_post(url, data, headers, timeout):
+        posted.append((url, data, dict(headers)))
+        rejected = url.endswith("plain") and "Content-Encoding" in headers
+        return SimpleNamespace(status_code=415 if rejected else 200)
+
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", lambda url: SimpleNamespace(post=fake_post))
+    payload = Payload({"text": "repeated " * 100})
+
+    send("https://example.com/small", {"a": 1}, compression="gzip")
+    send("https://example.com/gzip", payload, compression="gzip")
+    send("https://example.com/deflate", payload, compression="deflate")
+    send("https://example.com/plain", payload, compression="gzip")
+    send("https://example.com/plain", payload, compression="gzip")
+
+    assert "Content-Encoding" not in posted[0][2]
+    assert posted[1][2]["Content-Encoding"] == "gzip"
+    assert gzip.decompress(posted[1][1]) == payload.json
+    assert len(posted[1][1]) < len(payload.json)
+    assert zlib.decompress(posted[2][1]) == payload.json
+    # The url rejecting compressed payloads gets the payload again uncompressed, and is not sent compressed ones again
+    assert [(data, "Content-Encoding" in headers) for _, data, headers in posted[3:]] == [
+        (payload.compressed("gzip"), True), (payload.json, False), (payload.json, False),
+    ]
+
+
+@pytest.mark.django_db
+def test_streaming_payload_sends_rows_in_chunks(settings, monkeypatch):
+    """QuerySet rows are encoded a chunk at a time, and the body is the same JSON as the whole payload."""
+    settings.WEBHOOKS_STREAM_CHUNK_SIZE = 2
+    for i in range(5):
+        Webhook.objects.create(event="SESSION_LOGIN_COMPLETED", webhook_url=f"https://example.com/{i}")
+    rows = Webhook.objects.order_by("id").values("webhook_url")
+    payload = StreamingPayload({"event_metadata": {"event_type": "Test"}}, "webhooks", rows)
+    posted = []
+
+    def fake_post(url, data, headers, timeout):
+        posted.append((b"".join(data), dict(headers)))
+        return SimpleNamespace(status_code=200)
+
+    monkeypatch.setattr("openedx_webhooks.utils.get_session", lambda url: SimpleNamespace(post=fake_post))
+
+    # The metadata, 3 chunks of rows and the end
+    assert len(list(payload.chunks())) == 5
+    send("https://example.com/plain", payload)
+    send("https://example.com/gzip", payload, compression="gzip")
+
+    expected = {
+        "event_metadata": {"event_type": "Test"},
+        "webhooks": [{"webhook_url": f"https://example.com/{i}"} for i in range(5)],
+    }
+    assert json.loads(posted[0][0]) == expected
+    assert posted[1][1]["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(posted[1][0])) == expected
+    assert payload.data == expected